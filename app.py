@@ -1,14 +1,16 @@
 import streamlit as st
 import logging
-from datetime import datetime
-import os
-import json
 
 # Import our modules
 from news_scraper import NewsScraper
 from quote_generator import QuoteGenerator
 from social_media_manager import SocialMediaManager
-from config import BACKGROUND_COLORS
+from posting_queue import PostingQueue
+from article_index import ArticleIndex
+from quote_store import QuoteStore
+from quote_ranker import QuoteRanker
+from metrics import metrics, start_http_server
+from config import BACKGROUND_COLORS, QUOTES_PER_PAGE, NEWS_CACHE_TTL, QUOTES_CACHE_TTL, METRICS_PORT
 
 # Configure logging
 logging.basicConfig(
@@ -17,39 +19,199 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
+@st.cache_resource(show_spinner=False)
+def load_components():
+    """Build our components once per server process and share them across sessions and reruns"""
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    social_media = SocialMediaManager()
+    social_media.warm_up()  # connect clients in the background; the UI doesn't wait for logins
+    quote_store = QuoteStore()
+    posting_queue = PostingQueue({
+        'twitter': social_media.post_to_twitter,
+        'instagram': social_media.post_to_instagram
+    }, on_finish=quote_store.update_post)
+    posting_queue.start()
+    # Rank new quotes for novelty against what we've already posted
+    ranker = QuoteRanker(history=lambda: [q['text'] for q in quote_store.get_quotes(posted=True, limit=500)])
+    return NewsScraper(), QuoteGenerator(ranker=ranker), social_media, quote_store, posting_queue, ArticleIndex()
+
 # Initialize our components
-scraper = NewsScraper()
-quote_gen = QuoteGenerator()
-social_media = SocialMediaManager()
-
-# Setup cache directory
-os.makedirs('cache', exist_ok=True)
-CACHE_FILE = 'cache/quotes_cache.json'
-
-def save_quotes_to_cache(quotes):
-    """Save generated quotes to a cache file"""
-    with open(CACHE_FILE, 'w') as f:
-        json.dump({
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'quotes': quotes
-        }, f)
-
-def load_quotes_from_cache():
-    """Load quotes from cache if available and recent"""
-    if not os.path.exists(CACHE_FILE):
-        return None
-    
-    try:
-        with open(CACHE_FILE, 'r') as f:
-            data = json.load(f)
-            
-        # Check if quotes are from today
-        if data['date'] == datetime.now().strftime('%Y-%m-%d'):
-            return data['quotes']
-    except Exception as e:
-        logging.error(f"Error loading quotes from cache: {str(e)}")
-    
-    return None
+scraper, quote_gen, social_media, quote_store, posting_queue, article_index = load_components()
+
+@st.cache_data(ttl=NEWS_CACHE_TTL, show_spinner=False)
+def fetch_articles(max_articles):
+    """Fetch news, reusing the result across sessions for NEWS_CACHE_TTL seconds"""
+    return scraper.fetch_news(max_articles=max_articles)
+
+@st.cache_data(ttl=QUOTES_CACHE_TTL, show_spinner=False)
+def generate_quotes(articles, num_quotes):
+    """Generate quotes, reusing the result for the same articles for QUOTES_CACHE_TTL seconds
+
+    Also returns the articles that yielded candidate quotes, the only ones
+    to mark as seen.
+    """
+    candidates = quote_gen.generate_candidates(articles)
+    titles = {quote['article_title'] for quote in candidates}
+    return quote_gen.select_quotes(candidates, num_quotes), [a for a in articles if a['title'] in titles]
+
+def queue_post(platform, quote, image_path):
+    """Queue a post in the background and record it against the quote"""
+    job_id = posting_queue.enqueue(platform, quote, image_path)
+    quote_store.record_post(quote.get('id'), platform, job_id)
+    # The job may already have finished (e.g. a duplicate click); sync its status
+    quote_store.update_post(job_id, posting_queue.get_job(job_id)['status'])
+    st.info(f"Queued for {platform.capitalize()} (job {job_id}). See Posting Queue below.")
+
+def show_quote_row(number, quote):
+    """One quote with its preview and post buttons"""
+    key = quote.get('id', number)
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        st.markdown(f"### Quote {number}")
+        st.markdown(f"> {quote['text']}")
+        st.caption(f"Source: {quote['source']}")
+
+    with col2:
+        # Preview and post buttons
+        if st.button(f"Preview Quote {number}", key=f"preview_{key}"):
+            image_path = social_media.create_quote_image(
+                quote, background_color=st.session_state.selected_color)
+            quote_store.record_render(quote.get('id'), 'preview', image_path)
+            st.session_state.preview_image = image_path
+            st.session_state.preview_quote = quote
+
+        st.markdown("---")
+
+        # Social media posting buttons
+        if st.button(f"Post to Twitter", key=f"twitter_{key}"):
+            image_path = social_media.create_quote_image(
+                quote, background_color=st.session_state.selected_color)
+            queue_post('twitter', quote, image_path)
+
+        if st.button(f"Post to Instagram", key=f"insta_{key}"):
+            image_path = social_media.create_quote_image(
+                quote, background_color=st.session_state.selected_color)
+            queue_post('instagram', quote, image_path)
+
+    st.markdown("---")
+
+def change_page(delta):
+    st.session_state.quote_page = max(0, st.session_state.get('quote_page', 0) + delta)
+
+def reset_page():
+    st.session_state.quote_page = 0
+    # Per page of saved quotes, the id it starts below (None for the newest)
+    st.session_state.quote_cursors = [None]
+
+def page_controls(page, has_next):
+    """Previous/next buttons; callbacks update the page before the fragment reruns"""
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Previous", disabled=page == 0, on_click=change_page, args=(-1,))
+    with col2:
+        st.caption(f"Page {page + 1}")
+    with col3:
+        st.button("Next", disabled=not has_next, on_click=change_page, args=(1,))
+
+# Fragments rerun on their own, so paging or previewing doesn't redraw the whole page
+@st.fragment
+def show_quotes():
+    """Paginated quote list plus the preview panel"""
+    st.header("Select a Quote to Post")
+    view = st.radio("Show", ["Latest quotes", "All saved quotes"], horizontal=True, key="quote_view",
+                    on_change=reset_page)
+
+    if view == "All saved quotes":
+        cursors = st.session_state.get('quote_cursors')
+        if cursors is None or st.session_state.get('quote_page', 0) >= len(cursors):
+            reset_page()
+    page = st.session_state.get('quote_page', 0)
+    offset = page * QUOTES_PER_PAGE
+    # Load one extra row to know whether there is a next page without counting everything
+    if view == "Latest quotes":
+        window = st.session_state.quotes[offset:offset + QUOTES_PER_PAGE + 1]
+    else:
+        # Keyset pagination: seek past the last id of the previous page instead of skipping rows
+        cursors = st.session_state.quote_cursors
+        window = quote_store.get_quotes(limit=QUOTES_PER_PAGE + 1, before_id=cursors[page])
+        if len(window) > QUOTES_PER_PAGE:
+            del cursors[page + 1:]
+            cursors.append(window[QUOTES_PER_PAGE - 1]['id'])
+
+    page_controls(page, has_next=len(window) > QUOTES_PER_PAGE)
+    page_quotes = window[:QUOTES_PER_PAGE]
+
+    for i, quote in enumerate(page_quotes):
+        show_quote_row(offset + i + 1, quote)
+
+    # Display preview if available
+    if 'preview_image' in st.session_state:
+        st.header("Quote Preview")
+        st.image(st.session_state.preview_image)
+
+        # Add "Post This" buttons for the preview
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Post Preview to Twitter"):
+                queue_post('twitter', st.session_state.preview_quote, st.session_state.preview_image)
+
+        with col2:
+            if st.button("Post Preview to Instagram"):
+                queue_post('instagram', st.session_state.preview_quote, st.session_state.preview_image)
+
+@st.fragment(run_every=5)
+def show_posting_queue():
+    """Posting job status, polled every few seconds without rerunning the page"""
+    recent_jobs = posting_queue.recent_jobs(limit=10)
+    if recent_jobs:
+        with st.expander("Posting Queue"):
+            for job in recent_jobs:
+                status_line = f"**Job {job['id']}** - {job['platform'].capitalize()}: {job['status']} (attempts: {job['attempts']})"
+                st.markdown(status_line)
+                st.caption(job['quote']['text'][:80])
+                if job['last_error'] and job['status'] != 'succeeded':
+                    st.caption(f"Last error: {job['last_error']}")
+
+def show_diagnostics():
+    """Where refresh time goes: stage timings, cache hit rates, bytes fetched and token usage"""
+    with st.expander("Diagnostics"):
+        cols = st.columns(3)
+        for col, cache in zip(cols, ['http', 'llm', 'render']):
+            rate = metrics.hit_rate(cache)
+            col.metric(f"{cache.upper()} cache hit rate", "n/a" if rate is None else f"{rate:.0%}")
+
+        cols = st.columns(3)
+        cols[0].metric("Prompt tokens", metrics.counter_value('llm_tokens_total', kind='prompt'))
+        cols[1].metric("Completion tokens", metrics.counter_value('llm_tokens_total', kind='completion'))
+        cols[2].metric("Bytes fetched", f"{metrics.counter_value('fetch_bytes_total') / 1024:.0f} KB")
+
+        st.subheader("Timings (seconds)")
+        timings = [dict(span=row['labels'].pop('span'), labels=', '.join(f"{k}={v}" for k, v in row['labels'].items()),
+                        count=row['count'], mean=row['mean'], p50=row['p50'], p95=row['p95'], total=row['total'])
+                   for row in metrics.summary() if row['metric'] == 'span_seconds']
+        if timings:
+            st.dataframe(timings, hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nothing recorded yet. Refresh to collect timings.")
+
+        st.subheader("Recent spans")
+        for span in metrics.spans(limit=15):
+            labels = ', '.join(f"{k}={v}" for k, v in span['labels'].items())
+            parent = f" in {span['parent']}" if span['parent'] else ''
+            st.caption(f"{span['span']}({labels}){parent}: {span['duration_s'] * 1000:.0f} ms [{span['status']}]")
+
+        if scraper.health:
+            st.subheader("News sources")
+            for health in scraper.health.status():
+                latency = f", ~{health['latency']:.1f}s" if health['latency'] is not None else ''
+                retry = f", retrying in {health['retry_in']:.0f}s" if health['retry_in'] else ''
+                error = f" (last error: {health['last_error']})" if health['failures'] else ''
+                st.caption(f"{health['name']}: {health['state']}{latency}{retry}{error}")
+
+        st.download_button("Download metrics (Prometheus format)", metrics.render(),
+                           file_name="metrics.prom", mime="text/plain")
 
 def main():
     st.set_page_config(
@@ -57,116 +219,71 @@ def main():
         page_icon="💰",
         layout="wide"
     )
-    
+
     st.title("Finance Quote Generator & Social Media Automation")
     st.markdown("Generate impactful quotes from the latest financial news and post them to social media.")
-    
+
     # Sidebar for controls
     with st.sidebar:
         st.header("Controls")
         if st.button("Refresh Financial News & Generate Quotes"):
             with st.spinner("Fetching latest financial news..."):
-                articles = scraper.fetch_news(max_articles=15)
+                articles = fetch_articles(max_articles=15)
                 st.session_state.articles = articles
-                
-            with st.spinner("Generating quotes from news..."):
-                quotes = quote_gen.generate_quotes_from_articles(articles, num_quotes=10)
-                st.session_state.quotes = quotes
-                save_quotes_to_cache(quotes)
-                st.success(f"Generated {len(quotes)} quotes from {len(articles)} articles!")
-        
+                quote_store.save_articles(articles)
+                # Skip stories already processed or syndicated from another source
+                new_articles = article_index.filter_new(articles, record=False)
+
+            if not new_articles:
+                st.info(f"No new stories among {len(articles)} articles since the last refresh.")
+            else:
+                with st.spinner("Generating quotes from news..."):
+                    quotes, processed_articles = generate_quotes(new_articles, num_quotes=10)
+                    # Only stories that produced quotes count as seen; the rest come back next refresh
+                    article_index.record(processed_articles)
+                    quotes = quote_store.save_quotes(quotes)
+                    st.session_state.quotes = quotes
+                    reset_page()
+                    st.success(f"Generated {len(quotes)} quotes from {len(new_articles)} new articles!")
+
         st.markdown("---")
-        
+
         # Background color picker
         st.subheader("Image Background")
         selected_color = st.color_picker("Pick a color for quote background", BACKGROUND_COLORS[0])
         st.session_state.selected_color = selected_color
-    
+
+        st.markdown("---")
+        st.subheader("Connections")
+        for platform, state in social_media.connection_status().items():
+            st.caption(f"{platform.capitalize()}: {state}")
+
     # Main content area
     if 'quotes' not in st.session_state:
         # Try to load from cache first
-        cached_quotes = load_quotes_from_cache()
+        cached_quotes = quote_store.latest_batch()
         if cached_quotes:
             st.session_state.quotes = cached_quotes
             st.info("Loaded today's quotes from cache. Click 'Refresh' to get new quotes.")
         else:
             st.session_state.quotes = []
             st.info("Click 'Refresh Financial News & Generate Quotes' to get started.")
-    
+
     if 'articles' not in st.session_state:
         st.session_state.articles = []
-    
+
     if 'selected_color' not in st.session_state:
         st.session_state.selected_color = BACKGROUND_COLORS[0]
-    
+
     # Display quotes if available
-    if st.session_state.quotes:
-        st.header("Select a Quote to Post")
-        
-        for i, quote in enumerate(st.session_state.quotes):
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                st.markdown(f"### Quote {i+1}")
-                st.markdown(f"> {quote['text']}")
-                st.caption(f"Source: {quote['source']}")
-            
-            with col2:
-                # Preview and post buttons
-                if st.button(f"Preview Quote {i+1}", key=f"preview_{i}"):
-                    image_path = social_media.create_quote_image(
-                        quote, background_color=st.session_state.selected_color)
-                    st.session_state.preview_image = image_path
-                    st.session_state.preview_quote = quote
-                
-                st.markdown("---")
-                
-                # Social media posting buttons
-                if st.button(f"Post to Twitter", key=f"twitter_{i}"):
-                    image_path = social_media.create_quote_image(
-                        quote, background_color=st.session_state.selected_color)
-                    success = social_media.post_to_twitter(quote, image_path)
-                    if success:
-                        st.success("Posted to Twitter!")
-                    else:
-                        st.error("Failed to post to Twitter. Check logs.")
-                
-                if st.button(f"Post to Instagram", key=f"insta_{i}"):
-                    image_path = social_media.create_quote_image(
-                        quote, background_color=st.session_state.selected_color)
-                    success = social_media.post_to_instagram(quote, image_path)
-                    if success:
-                        st.success("Posted to Instagram!")
-                    else:
-                        st.error("Failed to post to Instagram. Check logs.")
-            
-            st.markdown("---")
-        
-        # Display preview if available
-        if 'preview_image' in st.session_state:
-            st.header("Quote Preview")
-            st.image(st.session_state.preview_image)
-            
-            # Add "Post This" buttons for the preview
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("Post Preview to Twitter"):
-                    success = social_media.post_to_twitter(
-                        st.session_state.preview_quote, st.session_state.preview_image)
-                    if success:
-                        st.success("Posted to Twitter!")
-                    else:
-                        st.error("Failed to post to Twitter. Check logs.")
-            
-            with col2:
-                if st.button("Post Preview to Instagram"):
-                    success = social_media.post_to_instagram(
-                        st.session_state.preview_quote, st.session_state.preview_image)
-                    if success:
-                        st.success("Posted to Instagram!")
-                    else:
-                        st.error("Failed to post to Instagram. Check logs.")
-    
+    if st.session_state.quotes or quote_store.get_quotes(limit=1):
+        show_quotes()
+
+    # Display posting job status
+    show_posting_queue()
+
+    show_diagnostics()
+
     # Display fetched articles at the bottom
     if st.session_state.articles:
         with st.expander("View Fetched Articles"):
@@ -176,4 +293,4 @@ def main():
                 st.markdown("---")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
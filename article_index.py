@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import ARTICLE_INDEX_PATH, ARTICLE_INDEX_TTL, DUPLICATE_TITLE_THRESHOLD, DUPLICATE_TITLE_MIN_WORDS
+
+# MinHash signature length and LSH banding; 8 bands of 4 rows flags pairs
+# from roughly 0.6 Jaccard similarity upward as candidates, which are then
+# compared exactly against DUPLICATE_TITLE_THRESHOLD
+NUM_PERMUTATIONS = 32
+NUM_BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+# Bump when what is stored changes; older indexes are discarded on open
+INDEX_VERSION = 2
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'cmpid', 'mod', 'siteid', '.tsrc'}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'were', 'will', 'with'
+}
+
+def canonicalize_url(url):
+    """Normalize a URL so syndicated and tracking-tagged links compare equal"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+def title_tokens(title):
+    """Lowercased content words of a headline in order, without punctuation or stopwords"""
+    return [token for token in re.findall(r"[a-z0-9]+(?:'[a-z]+)?", title.lower()) if token not in STOPWORDS]
+
+def title_shingles(tokens):
+    """Word bigrams of a headline's content words (the lone word for one-word titles)
+
+    Bigrams keep word order, so headlines that differ in a single entity
+    ("Fed raises rates..." vs "ECB raises rates...") lose two shingles
+    rather than one token, and stay below the duplicate threshold.
+    """
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+def minhash_signature(tokens):
+    """MinHash signature of a token set; equal positions estimate Jaccard similarity"""
+    if not tokens:
+        return [0] * NUM_PERMUTATIONS
+    signature = []
+    for seed in range(NUM_PERMUTATIONS):
+        salt = seed.to_bytes(2, 'big')
+        signature.append(min(
+            int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8, salt=salt).digest(), 'big')
+            for token in tokens
+        ))
+    return signature
+
+def band_keys(signature):
+    """LSH bucket keys; near-duplicate titles share at least one with high probability"""
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append(f"{band}:" + hashlib.blake2b(json.dumps(rows).encode('utf-8'), digest_size=8).hexdigest())
+    return keys
+
+class ArticleIndex:
+    """Persistent index of articles already seen across refreshes
+
+    Articles are matched by canonical URL and by near-duplicate title
+    (Jaccard similarity of content-word bigrams, with candidates found
+    through MinHash LSH buckets), so the same story syndicated across
+    sources is only processed once. Titles with fewer than `min_words`
+    content words are too short to tell stories apart and are matched by
+    URL only. An article whose URL was seen but whose title changed
+    materially counts as new. Entries not seen for `ttl` seconds expire.
+    """
+    def __init__(self, path=ARTICLE_INDEX_PATH, ttl=ARTICLE_INDEX_TTL, threshold=DUPLICATE_TITLE_THRESHOLD,
+                 min_words=DUPLICATE_TITLE_MIN_WORDS):
+        self.path = path
+        self.ttl = ttl
+        self.threshold = threshold
+        self.min_words = min_words
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+                conn.execute('DROP TABLE IF EXISTS title_bands')
+                conn.execute('DROP TABLE IF EXISTS seen_articles')
+                conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS seen_articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url_key TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    source TEXT,
+                    shingles TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS title_bands (
+                    band TEXT NOT NULL,
+                    article_id INTEGER NOT NULL REFERENCES seen_articles (id) ON DELETE CASCADE
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_title_bands_band ON title_bands (band)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_title_bands_article ON title_bands (article_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_articles_last_seen ON seen_articles (last_seen)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA foreign_keys = ON')
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def filter_new(self, articles, record=True, batch=None):
+        """Return only the articles not seen before (nor duplicated earlier in the list)
+
+        With record=True the returned articles are added to the index, and
+        duplicates refresh the expiry of the entry they matched. Callers that
+        only want to mark stories seen once they have been processed pass
+        record=False and call `record` afterwards.
+        """
+        batch = [] if batch is None else batch
+        with self._lock, self._connect() as conn:
+            now = time.time()
+            conn.execute('DELETE FROM seen_articles WHERE last_seen < ?', (now - self.ttl,))
+
+            new_articles = []
+            for article in articles:
+                if self._check(conn, article, now, record, batch):
+                    new_articles.append(article)
+            return new_articles
+
+    def iter_new(self, articles, record=True):
+        """Streaming form of filter_new for generator pipelines"""
+        batch = []
+        for article in articles:
+            if self.filter_new([article], record, batch):
+                yield article
+
+    def record(self, articles):
+        """Mark articles as seen, e.g. once quotes have been generated for them"""
+        with self._lock, self._connect() as conn:
+            now = time.time()
+            for article in articles:
+                self._check(conn, article, now, record=True)
+
+    def _check(self, conn, article, now, record, batch=None):
+        """True if the article is new or materially changed; records it when asked
+
+        `batch` collects (url key, shingles) of the articles accepted so far
+        in one call, so duplicates within it are caught without recording.
+        """
+        url_key = canonicalize_url(article['url'])
+        tokens = title_tokens(article['title'])
+        shingles = title_shingles(tokens)
+        match_titles = len(tokens) >= self.min_words
+        if batch is not None and any(
+                url_key == key or (match_titles and jaccard(shingles, other) >= self.threshold)
+                for key, other in batch):
+            return False
+
+        row = conn.execute('SELECT id, shingles FROM seen_articles WHERE url_key = ?', (url_key,)).fetchone()
+        if row:
+            if jaccard(shingles, set(json.loads(row[1]))) >= self.threshold:
+                if record:
+                    conn.execute('UPDATE seen_articles SET last_seen = ? WHERE id = ?', (now, row[0]))
+                return False
+            # Same page, new headline: treat as a fresh story
+            if record:
+                conn.execute('DELETE FROM seen_articles WHERE id = ?', (row[0],))
+        elif match_titles:
+            duplicate_id = self._find_similar_title(conn, shingles)
+            if duplicate_id is not None:
+                if record:
+                    conn.execute('UPDATE seen_articles SET last_seen = ? WHERE id = ?', (now, duplicate_id))
+                return False
+
+        if record:
+            cursor = conn.execute('''
+                INSERT INTO seen_articles (url_key, title, source, shingles, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (url_key, article['title'], article.get('source'), json.dumps(sorted(shingles)), now, now))
+            conn.executemany('INSERT INTO title_bands (band, article_id) VALUES (?, ?)',
+                             [(band, cursor.lastrowid) for band in band_keys(minhash_signature(shingles))])
+        if batch is not None:
+            batch.append((url_key, shingles))
+        return True
+
+    def _find_similar_title(self, conn, shingles):
+        """Id of an indexed article whose title is a near-duplicate, or None"""
+        bands = band_keys(minhash_signature(shingles))
+        placeholders = ','.join('?' * len(bands))
+        candidates = conn.execute(f'''
+            SELECT DISTINCT a.id, a.shingles FROM title_bands b
+            JOIN seen_articles a ON a.id = b.article_id
+            WHERE b.band IN ({placeholders})
+        ''', bands).fetchall()
+
+        for article_id, stored in candidates:
+            if jaccard(shingles, set(json.loads(stored))) >= self.threshold:
+                return article_id
+        return None
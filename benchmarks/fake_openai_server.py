@@ -0,0 +1,79 @@
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIServer:
+    """Local OpenAI-compatible /v1/chat/completions endpoint with configurable latency
+
+    Answers single-headline prompts with two quote lines and batch prompts
+    (response_format json_object) with one JSON entry per numbered headline.
+    """
+    def __init__(self, latency=0.5, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency)
+                payload = json.dumps(server._completion(body)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def _completion(self, body):
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        if body.get('response_format', {}).get('type') == 'json_object':
+            count = len(re.findall(r'^\s*\d+\. ', prompt, flags=re.MULTILINE))
+            content = json.dumps({'results': [
+                {'index': i, 'quotes': [
+                    f"Markets reward patience more reliably than prediction, headline {i}.",
+                    f"Risk is what remains after you think you've thought of everything, headline {i}."
+                ]} for i in range(1, count + 1)
+            ]})
+        else:
+            content = (
+                "Markets reward patience more reliably than they reward prediction.\n"
+                "Risk is what remains after you think you've thought of everything."
+            )
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-openai', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,76 @@
+import os
+import random
+import requests
+from config import NEWS_SOURCES, HEADLINE_PLANS, DEFAULT_HEADLINE_PLAN
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+WORDS = (
+    "stocks bonds yields fed inflation earnings rally selloff investors traders market "
+    "rates oil dollar treasury growth recession guidance outlook shares tech banks"
+).split()
+
+def fixture_path(source):
+    name = source['name'].lower().replace(' ', '_')
+    return os.path.join(FIXTURE_DIR, f"{name}.html")
+
+def record_fixtures(headers=None):
+    """Download every NEWS_SOURCES page into benchmarks/fixtures/ for offline runs"""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    headers = headers or {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+    recorded = []
+    for source in NEWS_SOURCES:
+        try:
+            response = requests.get(source['url'], headers=headers, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Could not record {source['name']}: {str(e)}")
+            continue
+        with open(fixture_path(source), 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        recorded.append(source['name'])
+    return recorded
+
+def synthetic_page(source, headlines=40, filler_blocks=1500, seed=0):
+    """A large page shaped like the source's headline plan, for when no recording exists"""
+    rng = random.Random(f"{source['name']}-{seed}")
+    plan = HEADLINE_PLANS.get(source['name'], DEFAULT_HEADLINE_PLAN)
+    tag = plan['tags'][0]
+    css_class = (plan.get('attrs') or {}).get('class', '')
+    class_attr = f' class="{css_class} extra"' if css_class else ''
+
+    def sentence(count):
+        return ' '.join(rng.choice(WORDS) for _ in range(count)).capitalize()
+
+    parts = ['<html><head><title>Markets</title></head><body>']
+    for i in range(filler_blocks):
+        parts.append(f'<div class="module-{i % 17}"><span>{sentence(6)}</span><p>{sentence(30)}.</p></div>')
+        if i % (filler_blocks // headlines) == 0:
+            link = f'/2024/01/{i}/story-{i}.html'
+            if tag == 'a':
+                parts.append(f'<a{class_attr} href="{link}">{sentence(9)}</a>')
+            else:
+                parts.append(f'<{tag}{class_attr}><a href="{link}">{sentence(9)}</a></{tag}>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+def load_fixture(source):
+    """Recorded page for a source if present, else a synthetic one; returns (html, kind)"""
+    path = fixture_path(source)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read(), 'recorded'
+    return synthetic_page(source), 'synthetic'
+
+def synthetic_quotes(count, seed=0):
+    """Quotes of varied length, for rendering benchmarks"""
+    rng = random.Random(seed)
+    quotes = []
+    for i in range(count):
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 28)))
+        quotes.append({
+            'text': f"{words.capitalize()} #{i}.",
+            'source': f"Based on {NEWS_SOURCES[i % len(NEWS_SOURCES)]['name']} headline",
+            'article_title': f"Synthetic headline {i}"
+        })
+    return quotes
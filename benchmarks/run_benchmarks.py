@@ -0,0 +1,204 @@
+"""Offline benchmarks for the scraper, quote generator and image renderer
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --output bench_results.json
+
+News pages come from benchmarks/fixtures/ (see --record) or synthetic pages
+shaped like each source's headline plan, LLM calls go to a local fake
+OpenAI-compatible server, and renders go to a temporary directory, so the
+numbers reflect our code rather than the network.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import openai
+import requests
+from requests.adapters import BaseAdapter
+from benchmarks.fixtures import load_fixture, record_fixtures, synthetic_quotes
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from news_scraper import NewsScraper, get_parser_backend
+from quote_generator import QuoteGenerator
+from social_media_manager import SocialMediaManager
+from text_layout import clear_layout_caches
+from config import NEWS_SOURCES
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport adapter answering source URLs with fixture pages"""
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        if request.url in self.pages:
+            response.status_code = 200
+            response._content = self.pages[request.url].encode('utf-8')
+        else:
+            response.status_code = 404
+            response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+def measure(name, func, iterations, items_per_call=1, warmup=1):
+    """Time `func(i)` over several iterations; returns latency percentiles, throughput and peak memory
+
+    tracemalloc slows allocation-heavy code considerably, so peak memory is
+    taken from one extra traced call rather than from the timed ones. It
+    counts Python allocations only; buffers held inside C extensions
+    (Pillow image data) are not included.
+    """
+    for i in range(warmup):
+        func(i)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        func(warmup + i)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(warmup + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'name': name,
+        'iterations': iterations,
+        'items_per_call': items_per_call,
+        'throughput_per_s': round(iterations * items_per_call / elapsed, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+def bench_fetch_news(iterations):
+    """fetch_news over fixture pages: headline extraction for every source, no network"""
+    pages, kinds = {}, {}
+    for source in NEWS_SOURCES:
+        pages[source['url']], kinds[source['name']] = load_fixture(source)
+
+    scraper = NewsScraper(use_cache=False, track_health=False)
+    adapter = FixtureAdapter(pages)
+    scraper.session.mount('https://', adapter)
+    scraper.session.mount('http://', adapter)
+
+    results = [
+        measure('fetch_news', lambda i: scraper.fetch_news(max_articles=50, concurrent=False),
+                iterations, items_per_call=len(NEWS_SOURCES)),
+        measure('fetch_news_concurrent', lambda i: scraper.fetch_news(max_articles=50),
+                iterations, items_per_call=len(NEWS_SOURCES))
+    ]
+    for result in results:
+        result['parser'] = get_parser_backend()
+        result['fixtures'] = kinds
+        result['articles'] = len(scraper.articles)
+    return results
+
+def bench_generate_quotes(iterations, latency, batch_size):
+    """generate_quotes_from_articles end to end against the fake server"""
+    server = FakeOpenAIServer(latency=latency).start()
+    openai.base_url = server.base_url
+    openai.api_key = 'benchmark'
+    try:
+        # Limits high enough that the buckets never throttle the benchmark itself
+        generator = QuoteGenerator(requests_per_minute=100000, tokens_per_minute=10 ** 9,
+                                   use_cache=False, batch_size=batch_size)
+        articles = [{'source': NEWS_SOURCES[i % len(NEWS_SOURCES)]['name'],
+                     'title': f"Synthetic market headline number {i} moves stocks", 'url': f"https://example.com/{i}"}
+                    for i in range(10)]
+        result = measure('generate_quotes_from_articles',
+                         lambda i: generator.generate_quotes_from_articles(articles, num_quotes=10),
+                         iterations, items_per_call=len(articles))
+        result['server_latency_s'] = latency
+        result['batch_size'] = batch_size
+        result['llm_requests'] = server.requests
+        return [result]
+    finally:
+        server.stop()
+
+def bench_create_quote_image(iterations, width, height):
+    """create_quote_image per image, cold (drawn and encoded) and cached (file reused)"""
+    quotes = synthetic_quotes(iterations + 2)
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            social_media = SocialMediaManager()
+            clear_layout_caches()
+            cold = measure('create_quote_image',
+                           lambda i: social_media.create_quote_image(quotes[i], width=width, height=height),
+                           iterations)
+            cached = measure('create_quote_image_cached',
+                             lambda i: social_media.create_quote_image(quotes[0], width=width, height=height),
+                             iterations)
+        finally:
+            os.chdir(previous_dir)
+    for result in (cold, cached):
+        result['size'] = f"{width}x{height}"
+    return [cold, cached]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks and save the results as JSON")
+    parser.add_argument('--only', choices=['fetch', 'generate', 'render'], action='append',
+                        help="run only these benchmarks (repeatable)")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="fake server latency per request, in seconds")
+    parser.add_argument('--batch-size', type=int, default=1, help="headlines per LLM request")
+    parser.add_argument('--width', type=int, default=1080)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--output', default=None, help="JSON file to write (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--record', action='store_true', help="download fresh fixtures for every source and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        recorded = record_fixtures()
+        print(f"Recorded fixtures for: {', '.join(recorded) or 'none'}")
+        return 0 if recorded else 1
+
+    selected = args.only or ['fetch', 'generate', 'render']
+    results = []
+    if 'fetch' in selected:
+        results.extend(bench_fetch_news(args.iterations))
+    if 'generate' in selected:
+        results.extend(bench_generate_quotes(max(1, args.iterations // 4), args.llm_latency, args.batch_size))
+    if 'render' in selected:
+        results.extend(bench_create_quote_image(args.iterations, args.width, args.height))
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results',
+                                         f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        print(f"{result['name']:<32} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+              f"{result['throughput_per_s']:>9.2f}/s  peak {result['peak_memory_kb']:>9.1f} KB")
+    print(f"Results written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # API Keys
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 CLAUDE_API_KEY = os.environ.get("CLAUDE_API_KEY")
 TWITTER_API_KEY = os.environ.get("TWITTER_API_KEY")
 TWITTER_API_SECRET = os.environ.get("TWITTER_API_SECRET")
@@ -13,6 +14,19 @@ TWITTER_ACCESS_SECRET = os.environ.get("TWITTER_ACCESS_SECRET")
 INSTAGRAM_USERNAME = os.environ.get("spicy.fades")
 INSTAGRAM_PASSWORD = os.environ.get("Apples123!")
 
+# Social Media Client Settings
+INSTAGRAM_SESSION_FILE = os.path.join('cache', 'instagram_session.json')  # reused to skip full logins
+CLIENT_INIT_TIMEOUT = 30  # seconds to wait for a background client login before giving up
+
+# Posting Queue Settings
+POST_QUEUE_PATH = os.path.join('cache', 'post_queue.sqlite3')
+POST_WORKERS = 2
+POST_MAX_ATTEMPTS = 5
+POST_BACKOFF_BASE = 30  # seconds before the first retry; doubled on every later one
+POST_BACKOFF_MAX = 15 * 60
+POST_RATE_LIMITS = {"twitter": 5, "instagram": 2}  # posts per minute
+POST_LEASE_SECONDS = 60  # a running job whose worker stops renewing its lease this long is re-queued
+
 # News Sources
 NEWS_SOURCES = [
     {"name": "CNBC", "url": "https://www.cnbc.com/finance/"},
@@ -22,11 +36,108 @@ NEWS_SOURCES = [
     {"name": "Financial Times", "url": "https://www.ft.com/markets"}
 ]
 
+# Seen-Article Index Settings
+ARTICLE_INDEX_PATH = os.path.join('cache', 'article_index.sqlite3')
+ARTICLE_INDEX_TTL = 3 * 24 * 60 * 60  # seconds an unseen story stays in the index
+DUPLICATE_TITLE_THRESHOLD = 0.8  # Jaccard similarity of headline word bigrams at which they count as the same story
+DUPLICATE_TITLE_MIN_WORDS = 5  # shorter headlines are only matched by URL
+
+# Headline Extraction Plans
+# Each plan names the elements that hold a source's headlines so the parser
+# only keeps those nodes. Sources without a plan, or whose plan finds nothing
+# (e.g. after a site redesign), fall back to the generic h1-h4 scan.
+DEFAULT_HEADLINE_PLAN = {"tags": ["h1", "h2", "h3", "h4"], "attrs": {}, "limit": 10}
+HEADLINE_PLANS = {
+    "CNBC": {"tags": ["a"], "attrs": {"class": "Card-title"}, "limit": 10},
+    "Yahoo Finance": {"tags": ["h3"], "attrs": {}, "limit": 10},
+    "MarketWatch": {"tags": ["h3"], "attrs": {"class": "article__headline"}, "limit": 10},
+}
+
+# HTML parser backend for BeautifulSoup; None picks the fastest one installed
+HTML_PARSER = os.environ.get("HTML_PARSER")
+
+# News Fetching Settings
+FETCH_CONNECT_TIMEOUT = 3.05  # seconds to establish a connection to a source
+FETCH_READ_TIMEOUT = 10  # seconds to wait between bytes from a source
+FETCH_DEADLINE = 15  # overall wall-clock budget for one refresh, in seconds
+FETCH_MAX_WORKERS = len(NEWS_SOURCES)
+
+# Source Health Settings
+SOURCE_HEALTH_PATH = os.path.join('cache', 'source_health.sqlite3')
+SOURCE_FAILURE_THRESHOLD = 3  # consecutive failures before a source is skipped
+SOURCE_COOLDOWN = 5 * 60  # seconds a failing source is skipped; doubles each time its trial fetch fails
+SOURCE_COOLDOWN_MAX = 2 * 60 * 60
+SOURCE_MIN_READ_TIMEOUT = 2  # floor for adaptive read timeouts, in seconds
+SOURCE_LATENCY_SAMPLES = 3  # successful fetches before a source's timeout adapts to its latency
+
+# Article Content Settings
+ARTICLE_MAX_CHARS = 5000  # characters of body text kept per article
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024  # hard cap on bytes downloaded per article when streaming
+ARTICLE_CHUNK_SIZE = 16 * 1024
+
+# HTTP Response Cache Settings
+HTTP_CACHE_DIR = os.path.join('cache', 'http')
+HTTP_CACHE_TTL = int(os.environ.get("HTTP_CACHE_TTL", 300))  # seconds before a page is revalidated
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Quote Generation Settings
+LLM_MODEL = "gpt-3.5-turbo"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_TOKENS = 200
+LLM_MAX_CONCURRENCY = 5  # simultaneous completion requests
+LLM_REQUESTS_PER_MINUTE = 60
+LLM_TOKENS_PER_MINUTE = 40000
+LLM_MAX_RETRIES = 4  # retries per article on 429 / 5xx / connection errors
+LLM_BACKOFF_BASE = 1.0  # seconds; doubled on every retry, with full jitter
+LLM_BACKOFF_MAX = 20.0
+LLM_DEADLINE = 60  # overall wall-clock budget for one generation batch, in seconds
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", 1))  # headlines per request; >1 trades latency for fewer tokens
+LLM_MAX_ARTICLES = 10  # headlines turned into quotes per refresh or pipeline run
+
+# Generated Quote Cache Settings
+LLM_CACHE_PATH = os.path.join('cache', 'llm_cache.sqlite3')
+LLM_CACHE_TTL = 3 * 24 * 60 * 60  # seconds a headline's quotes are reused
+LLM_CACHE_MAX_ENTRIES = 5000
+
 # UI Configuration
 BACKGROUND_COLORS = [
     "#1E88E5", "#43A047", "#E53935", "#5E35B1", "#FB8C00", 
     "#00ACC1", "#3949AB", "#8E24AA", "#D81B60", "#7CB342"
 ]
 
+QUOTES_PER_PAGE = 5
+NEWS_CACHE_TTL = 5 * 60  # seconds the app reuses fetched news across sessions
+QUOTES_CACHE_TTL = 60 * 60  # seconds the app reuses quotes generated for the same articles
+
+# Image Rendering Settings
+RENDER_SIZES = {
+    "instagram": (1080, 1080),
+    "twitter": (1200, 675)
+}
+RENDER_QUALITY = 90  # JPEG/WebP encoder quality
+RENDER_MAX_WORKERS = None  # process pool size for batch renders; None uses every CPU
+
+# Quote Store Settings
+QUOTE_STORE_PATH = os.path.join('cache', 'quotes.sqlite3')
+
+# Headless Pipeline Settings
+PIPELINE_QUEUE_SIZE = 8  # max items buffered between pipeline stages
+
 # Quote Formatting Settings
-MAX_QUOTE_LENGTH = 200 
\ No newline at end of file
+MAX_QUOTE_LENGTH = 200
+
+# Quote Ranking Settings
+RANKER_WEIGHTS = {
+    "length": 1.0,  # closeness to the ideal length for MAX_QUOTE_LENGTH
+    "novelty": 1.0,  # dissimilarity from previously posted quotes
+    "redundancy": 0.5,  # penalty for similarity to quotes already selected
+    "source_repeat": 0.3  # penalty per quote already selected from the same source
+}
+RANKER_DUPLICATE_THRESHOLD = 0.8  # cosine similarity at which a candidate counts as a duplicate
+
+# Metrics Settings
+METRICS_PREFIX = "quotemaker"
+METRICS_PATH = os.path.join('cache', 'metrics.prom')  # Prometheus text file written after pipeline runs
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))  # serve /metrics on this port; 0 disables the endpoint
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # interface /metrics listens on; "0.0.0.0" exposes it
+METRICS_RECENT_SPANS = 200  # spans kept for the diagnostics panel
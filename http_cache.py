@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from config import HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES
+
+class CachedResponse:
+    """Body of a cached or freshly fetched page
+
+    `not_modified` is True when the body is the same one we stored last time
+    (served fresh from disk or confirmed by a 304), so callers can reuse
+    anything they derived from it via `extras` instead of parsing again.
+    `from_network` is False when the body came from disk without a request.
+    `size` is the body length in bytes.
+    """
+    def __init__(self, url, text, not_modified=False, extras=None, from_network=True, size=0):
+        self.url = url
+        self.text = text
+        self.size = size
+        self.not_modified = not_modified
+        self.extras = extras or {}
+        self.from_network = from_network
+
+class HTTPCache:
+    """Persistent on-disk HTTP cache honoring ETag / Last-Modified
+
+    Each URL is stored as a body file plus a JSON metadata file under
+    `cache_dir`. Entries younger than `ttl` seconds are served without
+    touching the network; older ones are revalidated with a conditional GET.
+    The total body size is kept under `max_bytes` by evicting the least
+    recently used entries.
+    """
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable HTTP cache entry for {url}: {str(e)}")
+            return None
+
+    def _save_meta(self, url, meta):
+        meta_path, _ = self._paths(url)
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def _read_body(self, url):
+        _, body_path = self._paths(url)
+        with open(body_path, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def get(self, session, url, timeout):
+        """Return a CachedResponse for url, using the network only when needed"""
+        meta = self._load_meta(url)
+        now = time.time()
+
+        if meta and now - meta['fetched_at'] < self.ttl:
+            try:
+                text = self._read_body(url)
+                os.utime(self._paths(url)[0])  # refresh mtime for LRU eviction
+                return CachedResponse(url, text, not_modified=True, extras=meta.get('extras'), from_network=False,
+                                      size=meta.get('size', 0))
+            except OSError:
+                meta = None
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and meta:
+            try:
+                text = self._read_body(url)
+                with self._lock:
+                    # Re-read so extras stored since we loaded meta are kept
+                    meta = self._load_meta(url) or meta
+                    meta['fetched_at'] = now
+                    self._save_meta(url, meta)
+                return CachedResponse(url, text, not_modified=True, extras=meta.get('extras'), size=meta.get('size', 0))
+            except OSError:
+                # Body vanished under us; fall back to an unconditional fetch
+                response = session.get(url, timeout=timeout)
+
+        response.raise_for_status()
+        text = response.text
+        self.store(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return CachedResponse(url, text, size=len(response.content))
+
+    def store(self, url, text, etag=None, last_modified=None):
+        """Store a page body, replacing any previous entry and its extras"""
+        meta_path, body_path = self._paths(url)
+        body = text.encode('utf-8')
+        self._write_atomic(body_path, body)
+        self._save_meta(url, {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+            'size': len(body),
+            'extras': {}
+        })
+        self._evict()
+
+    def set_extra(self, url, name, value):
+        """Attach JSON-serializable data derived from the cached body of url"""
+        with self._lock:
+            meta = self._load_meta(url)
+            if meta is None:
+                return
+            meta.setdefault('extras', {})[name] = value
+            self._save_meta(url, meta)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.body'):
+                    continue
+                body_path = os.path.join(self.cache_dir, name)
+                meta_path = body_path[:-len('.body')] + '.json'
+                try:
+                    size = os.path.getsize(body_path)
+                    last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+                except OSError:
+                    continue
+                entries.append((last_used, size, body_path, meta_path))
+                total += size
+
+            entries.sort()
+            for _, size, body_path, meta_path in entries:
+                if total <= self.max_bytes:
+                    break
+                for path in (meta_path, body_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+from contextlib import contextmanager
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES
+
+def normalize_headline(title):
+    """Casefold and collapse whitespace so trivially different headlines share a key"""
+    return ' '.join(title.split()).casefold()
+
+def make_cache_key(title, source, prompt_template, model, temperature):
+    """Stable content hash of everything that determines a completion"""
+    payload = json.dumps({
+        'title': normalize_headline(title),
+        'source': source,
+        'prompt': prompt_template,
+        'model': model,
+        'temperature': temperature
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """Persistent generated-quote cache shared safely between processes
+
+    Backed by SQLite in WAL mode, so several app workers can read and write
+    concurrently. Entries expire after `ttl` seconds and the least recently
+    used ones are evicted once more than `max_entries` are stored.
+    """
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)')
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached value for key, or None when missing or expired"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value, created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    conn.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+                    return json.loads(row[0])
+                if row:
+                    conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logging.error(f"Error reading LLM cache: {str(e)}")
+        return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable value and evict old entries beyond the size bound"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(value), now, now)
+                )
+                conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (now - self.ttl,))
+                conn.execute('''
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+        except sqlite3.Error as e:
+            logging.error(f"Error writing LLM cache: {str(e)}")
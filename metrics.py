@@ -0,0 +1,220 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_PREFIX, METRICS_RECENT_SPANS, METRICS_PATH, METRICS_HOST
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Observations kept per histogram series for the in-app percentiles
+RECENT_OBSERVATIONS = 500
+
+METRIC_HELP = {
+    'span_seconds': "Duration of instrumented operations, by span",
+    'span_errors_total': "Instrumented operations that raised, by span",
+    'fetch_bytes_total': "Bytes downloaded, by news source ('articles' for article bodies)",
+    'fetch_errors_total': "News source fetches that failed",
+    'fetch_skipped_total': "News source fetches skipped because the source's circuit was open",
+    'cache_requests_total': "Cache lookups, by cache and hit/miss",
+    'llm_tokens_total': "Tokens reported by the LLM API, by prompt/completion",
+    'llm_retries_total': "Completion requests retried after a transient error",
+}
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for one label set, plus recent raw values"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_OBSERVATIONS)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class MetricsRegistry:
+    """Thread-safe counters, histograms and spans, exported in Prometheus text format
+
+    Counters only go up; histograms record durations (or any other
+    distribution) into fixed buckets. `span` times a block of code into
+    the `span_seconds` histogram and keeps the last few spans, with their
+    parent span on the same thread, for the diagnostics panel.
+    """
+    def __init__(self, prefix=METRICS_PREFIX, recent_spans=METRICS_RECENT_SPANS):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.recent_spans = deque(maxlen=recent_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, amount=1, **labels):
+        """Add `amount` to a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one value in a histogram"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block as span `name`; exceptions are counted and re-raised"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        started_at = time.time()
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            stack.pop()
+            self.observe('span_seconds', duration, span=name, **labels)
+            if status == 'error':
+                self.inc('span_errors_total', span=name, **labels)
+            with self._lock:
+                self.recent_spans.append({
+                    'span': name, 'labels': labels, 'parent': parent, 'status': status,
+                    'started_at': started_at, 'duration_s': duration,
+                    'thread': threading.current_thread().name
+                })
+
+    def counter_value(self, name, **labels):
+        """Current value of a counter; without labels, the total across all label sets"""
+        with self._lock:
+            if labels:
+                return self.counters.get((name, _label_key(labels)), 0)
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def hit_rate(self, cache):
+        """Share of lookups in `cache` that were hits, or None before the first lookup"""
+        hits = self.counter_value('cache_requests_total', cache=cache, result='hit')
+        misses = self.counter_value('cache_requests_total', cache=cache, result='miss')
+        return hits / (hits + misses) if hits + misses else None
+
+    def summary(self):
+        """Rows of count, total, mean, p50 and p95 for every histogram series"""
+        rows = []
+        with self._lock:
+            for (name, key), histogram in sorted(self.histograms.items()):
+                rows.append({
+                    'metric': name,
+                    'labels': dict(key),
+                    'count': histogram.count,
+                    'total': round(histogram.sum, 4),
+                    'mean': round(histogram.sum / histogram.count, 4) if histogram.count else 0.0,
+                    'p50': round(histogram.percentile(0.5), 4),
+                    'p95': round(histogram.percentile(0.95), 4)
+                })
+        return rows
+
+    def spans(self, limit=50):
+        """Most recent spans first"""
+        with self._lock:
+            return list(self.recent_spans)[-limit:][::-1]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('histogram', self.histograms)):
+                names = sorted({name for name, _ in series})
+                for name in names:
+                    full_name = f"{self.prefix}_{name}"
+                    if name in METRIC_HELP:
+                        lines.append(f"# HELP {full_name} {METRIC_HELP[name]}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for (series_name, key), value in sorted(series.items()):
+                        if series_name != name:
+                            continue
+                        if kind == 'counter':
+                            lines.append(f"{full_name}{_format_labels(key)} {value}")
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(value.buckets, value.counts):
+                            cumulative += count
+                            lines.append(f"{full_name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+                        lines.append(f"{full_name}_bucket{_format_labels(key, [('le', '+Inf')])} {value.count}")
+                        lines.append(f"{full_name}_sum{_format_labels(key)} {value.sum}")
+                        lines.append(f"{full_name}_count{_format_labels(key)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path=METRICS_PATH):
+        """Write the metrics atomically, e.g. for node_exporter's textfile collector"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.recent_spans.clear()
+
+def start_http_server(port, registry=None, host=METRICS_HOST):
+    """Serve the registry at http://host:port/metrics from a daemon thread"""
+    registry = registry or metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            payload = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# Shared registry the scraper, generator and social media manager (renders and posts) report to
+metrics = MetricsRegistry()
@@ -1,75 +1,318 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+import re
+import time
+import codecs
 import logging
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
-from config import NEWS_SOURCES
+from http_cache import HTTPCache
+from metrics import metrics
+from source_health import SourceHealth
+from config import (
+    NEWS_SOURCES, FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT,
+    FETCH_DEADLINE, FETCH_MAX_WORKERS,
+    DEFAULT_HEADLINE_PLAN, HEADLINE_PLANS, HTML_PARSER,
+    ARTICLE_MAX_CHARS, ARTICLE_MAX_BYTES, ARTICLE_CHUNK_SIZE
+)
 
 class NewsScraperError(Exception):
     pass
 
+def get_parser_backend():
+    """Return the BeautifulSoup parser to use, preferring the C-based lxml when installed"""
+    if HTML_PARSER:
+        return HTML_PARSER
+    if builder_registry.lookup('lxml'):
+        return 'lxml'
+    return 'html.parser'
+
+class ParagraphCollector(HTMLParser):
+    """Incremental parser that keeps the text of <p> elements longer than 50 chars
+
+    Fed chunk by chunk; `full` turns True once `max_chars` of paragraph text
+    have been collected so the caller can stop reading.
+    """
+    def __init__(self, max_chars=ARTICLE_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.paragraphs = []
+        self.length = 0
+        self._depth = 0
+        self._current = []
+
+    @property
+    def full(self):
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            # <p> cannot nest, so an open paragraph is implicitly closed
+            self._flush()
+            self._depth = 1
+
+    def handle_endtag(self, tag):
+        if tag == 'p' and self._depth:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._depth:
+            self._current.append(data)
+
+    def _flush(self):
+        text = ''.join(self._current)
+        self._current = []
+        self._depth = 0
+        if len(text) > 50 and not self.full:
+            self.paragraphs.append(text)
+            self.length += len(text) + 1
+
+    def content(self):
+        self._flush()
+        return ' '.join(self.paragraphs)[:self.max_chars]
+
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, use_cache=True, track_health=True):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.timeout = (FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT)
         self.articles = []
-    
-    def fetch_news(self, max_articles=20):
-        """Fetch financial news from configured sources"""
+        self.parser = get_parser_backend()
+        self.http_cache = HTTPCache() if use_cache else None
+        self.health = SourceHealth() if track_health else None
+
+        # One keep-alive connection pool shared by every source and worker thread
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=FETCH_MAX_WORKERS, pool_maxsize=FETCH_MAX_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch_news(self, max_articles=20, concurrent=True, deadline=FETCH_DEADLINE):
+        """Fetch financial news from configured sources
+
+        With concurrent=True all sources are fetched in parallel and the call
+        returns once every source has answered or `deadline` seconds have
+        passed, whichever comes first. Sources still in flight at the deadline
+        are dropped and the articles gathered so far are returned. Sources
+        that keep failing are skipped until their circuit's cool-off expires
+        (see SourceHealth).
+        """
+        with metrics.span('fetch_news'):
+            if concurrent:
+                results = self._fetch_sources_concurrently(NEWS_SOURCES, deadline)
+            else:
+                results = {}
+                for source in NEWS_SOURCES:
+                    results[source['name']] = self._fetch_source_safely(source)
+
+        # Keep the configured source order regardless of completion order
         self.articles = []
-        
         for source in NEWS_SOURCES:
-            try:
-                response = requests.get(source['url'], headers=self.headers, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract headlines and links - this is a generic approach
-                # You may need to customize this for each source
-                headlines = soup.find_all(['h1', 'h2', 'h3', 'h4'], limit=10)
-                
-                for headline in headlines:
-                    if headline.find('a'):
-                        link = headline.find('a').get('href', '')
-                        title = headline.text.strip()
-                        
-                        # Make relative URLs absolute
-                        if link and not link.startswith(('http://', 'https://')):
-                            if link.startswith('/'):
-                                base_url = '/'.join(source['url'].split('/')[:3])
-                                link = base_url + link
-                            else:
-                                link = source['url'] + link
-                        
-                        if link and title and len(title) > 15:  # Filter out very short titles
-                            self.articles.append({
-                                'source': source['name'],
-                                'title': title,
-                                'url': link,
-                                'date': datetime.now().strftime('%Y-%m-%d')
-                            })
-                
-            except Exception as e:
-                logging.error(f"Error fetching news from {source['name']}: {str(e)}")
-        
+            self.articles.extend(results.get(source['name'], []))
+
         # Return the most recent articles, limiting to max_articles
         return self.articles[:max_articles]
-    
-    def fetch_article_content(self, article_url):
-        """Fetch and extract the main content of an article"""
+
+    def iter_news(self, max_articles=20, deadline=FETCH_DEADLINE):
+        """Yield articles source by source as each fetch completes
+
+        Streaming counterpart of fetch_news for pipelines: downstream work can
+        start on the first source's headlines while slower sources are still
+        loading. Stops after `max_articles` or at the deadline.
+        """
+        executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix='news-fetch')
+        futures = {executor.submit(self._fetch_source_safely, source): source for source in NEWS_SOURCES}
+        yielded = 0
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                for article in future.result():
+                    if yielded >= max_articles:
+                        return
+                    yielded += 1
+                    yield article
+        except FuturesTimeoutError:
+            pending = [source['name'] for future, source in futures.items() if not future.done()]
+            logging.warning(f"Skipping {', '.join(pending)}: no response within the {deadline}s refresh deadline")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_sources_concurrently(self, sources, deadline):
+        """Fetch sources on a thread pool, keeping whatever finishes before the deadline"""
+        executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix='news-fetch')
+        try:
+            futures = {executor.submit(self._fetch_source_safely, source): source for source in sources}
+            done, not_done = wait(futures, timeout=deadline)
+
+            for future in not_done:
+                logging.warning(f"Skipping {futures[future]['name']}: no response within the {deadline}s refresh deadline")
+
+            return {futures[future]['name']: future.result() for future in done}
+        finally:
+            # Don't block on stragglers; their results are simply discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_source_safely(self, source):
+        """Fetch one source through its circuit breaker, returning [] when it is skipped or fails
+
+        Network and HTTP errors count against the source's health; any other
+        error is a bug in extraction, logged with its traceback.
+        """
+        name = source['name']
+        if self.health and not self.health.allow(name):
+            metrics.inc('fetch_skipped_total', source=name)
+            logging.info(f"Skipping {name}: circuit open after repeated failures")
+            return []
+
+        try:
+            return self._fetch_source(source)
+        except requests.RequestException as e:
+            metrics.inc('fetch_errors_total', source=name)
+            logging.error(f"Error fetching news from {name}: {str(e)}")
+            if self.health and self.health.record_failure(name, e):
+                logging.warning(f"Circuit opened for {name}; skipping it until its cool-off expires")
+            return []
+        except Exception:
+            metrics.inc('fetch_errors_total', source=name)
+            logging.exception(f"Error extracting news from {name}")
+            return []
+
+    def _fetch_source(self, source):
+        """Fetch and extract headline articles from a single source"""
+        articles = []
+        today = datetime.now().strftime('%Y-%m-%d')
+        timeout = self.health.timeout_for(source['name']) if self.health else self.timeout
+
+        started = time.monotonic()
+        with metrics.span('fetch', source=source['name']):
+            if self.http_cache:
+                response = self.http_cache.get(self.session, source['url'], timeout)
+            else:
+                response = self.session.get(source['url'], timeout=timeout)
+                response.raise_for_status()
+        if self.health and getattr(response, 'from_network', True):
+            self.health.record_success(source['name'], time.monotonic() - started)
+
+        if self.http_cache:
+            metrics.inc('cache_requests_total', cache='http', result='hit' if response.not_modified else 'miss')
+            # Unchanged page: reuse the headlines extracted last time
+            if response.not_modified and 'articles' in response.extras:
+                return [dict(article, date=today) for article in response.extras['articles']]
+            body_size = 0 if response.not_modified else response.size
+        else:
+            body_size = len(response.content)
+        metrics.inc('fetch_bytes_total', body_size, source=source['name'])
+
+        plan = HEADLINE_PLANS.get(source['name'], DEFAULT_HEADLINE_PLAN)
+        with metrics.span('parse', source=source['name']):
+            headlines = self._find_headlines(response.text, plan)
+            if not headlines and plan is not DEFAULT_HEADLINE_PLAN:
+                logging.warning(f"Headline plan for {source['name']} matched nothing, using the generic scan")
+                headlines = self._find_headlines(response.text, DEFAULT_HEADLINE_PLAN)
+
+        for headline in headlines:
+            anchor = headline if headline.name == 'a' else headline.find('a')
+            if anchor:
+                link = anchor.get('href', '')
+                title = headline.text.strip()
+
+                # Make relative URLs absolute
+                if link and not link.startswith(('http://', 'https://')):
+                    if link.startswith('/'):
+                        base_url = '/'.join(source['url'].split('/')[:3])
+                        link = base_url + link
+                    else:
+                        link = source['url'] + link
+
+                if link and title and len(title) > 15:  # Filter out very short titles
+                    articles.append({
+                        'source': source['name'],
+                        'title': title,
+                        'url': link,
+                        'date': today
+                    })
+
+        if self.http_cache:
+            self.http_cache.set_extra(source['url'], 'articles', articles)
+
+        return articles
+
+    def _find_headlines(self, html, plan):
+        """Parse only the nodes named by an extraction plan and return them"""
+        attrs = dict(plan.get('attrs') or {})
+        if isinstance(attrs.get('class'), str):
+            # While parsing, class is still the raw attribute string, so match one token of it
+            attrs['class'] = re.compile(r'(^|\s)' + re.escape(attrs['class']) + r'(\s|$)')
+
+        soup = BeautifulSoup(html, self.parser, parse_only=SoupStrainer(plan['tags'], attrs=attrs))
+        return soup.find_all(plan['tags'], attrs=attrs, limit=plan.get('limit', 10))
+
+    def fetch_article_content(self, article_url, stream=False):
+        """Fetch and extract the main content of an article
+
+        With stream=True the page is read in chunks and parsed incrementally;
+        reading stops as soon as enough paragraph text has been collected or
+        ARTICLE_MAX_BYTES have been downloaded. Streamed pages bypass the
+        HTTP cache since only part of the body is ever read.
+        """
+        if stream:
+            return self._stream_article_content(article_url)
+
         try:
-            response = requests.get(article_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
+            if self.http_cache:
+                response = self.http_cache.get(self.session, article_url, self.timeout)
+                if response.not_modified and 'content' in response.extras:
+                    return response.extras['content']
+                if not response.not_modified:
+                    metrics.inc('fetch_bytes_total', response.size, source='articles')
+            else:
+                response = self.session.get(article_url, timeout=self.timeout)
+                response.raise_for_status()
+                metrics.inc('fetch_bytes_total', len(response.content), source='articles')
+
+            soup = BeautifulSoup(response.text, self.parser, parse_only=SoupStrainer('p'))
+
             # Extract article paragraphs - this is a generic approach
             paragraphs = soup.find_all('p')
             content = ' '.join([p.text for p in paragraphs if len(p.text) > 50])
-            
-            return content[:5000]  # Limit to first 5000 chars to avoid processing too much text
-            
+            content = content[:ARTICLE_MAX_CHARS]  # Limit the text to avoid processing too much
+
+            if self.http_cache:
+                self.http_cache.set_extra(article_url, 'content', content)
+
+            return content
+
+        except Exception as e:
+            logging.error(f"Error fetching article content from {article_url}: {str(e)}")
+            return ""
+
+    def _stream_article_content(self, article_url, max_chars=ARTICLE_MAX_CHARS, max_bytes=ARTICLE_MAX_BYTES):
+        """Read an article incrementally, stopping once the character or byte budget is spent"""
+        collector = ParagraphCollector(max_chars)
+        received = 0
+
+        try:
+            with self.session.get(article_url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+
+                for chunk in response.iter_content(chunk_size=ARTICLE_CHUNK_SIZE):
+                    received += len(chunk)
+                    collector.feed(decoder.decode(chunk))
+                    if collector.full:
+                        break
+                    if received >= max_bytes:
+                        logging.warning(f"Stopped reading {article_url} after {received} bytes (download cap)")
+                        break
+
+            return collector.content()
+
         except Exception as e:
             logging.error(f"Error fetching article content from {article_url}: {str(e)}")
-            return "" 
\ No newline at end of file
+            return ""
+        finally:
+            metrics.inc('fetch_bytes_total', received, source='articles')
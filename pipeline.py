@@ -0,0 +1,332 @@
+import sys
+import time
+import uuid
+import queue
+import itertools
+import logging
+import argparse
+import threading
+from config import (
+    BACKGROUND_COLORS, RENDER_MAX_WORKERS, PIPELINE_QUEUE_SIZE, METRICS_PATH, LLM_MAX_ARTICLES
+)
+
+# Marks the end of a stage's input; passed on once every worker has finished
+_DONE = object()
+
+class StageStats:
+    """Counters for one pipeline stage
+
+    `blocked` is time spent waiting to hand items to a full downstream
+    queue (back-pressure); `starved` is time spent waiting for input.
+    """
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.starved = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def report(self):
+        elapsed = (self.finished_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_per_s': round(self.items_out / elapsed, 3) if elapsed > 0 else 0.0,
+            'busy_s': round(self.busy, 3),
+            'blocked_s': round(self.blocked, 3),
+            'starved_s': round(self.starved, 3)
+        }
+
+class Stage:
+    """One pipeline step: `func(item)` returns an iterable of output items
+
+    Runs on `workers` threads reading from a bounded input queue and writing
+    to a bounded output queue, so a slow stage throttles the ones before it.
+    `flush()`, if given, runs once after the last input item and its outputs
+    are emitted too; stages that need every item (e.g. ranking) collect
+    them in `func` and produce their output there.
+    """
+    def __init__(self, name, func, workers=1, flush=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.flush = flush
+        self.stats = StageStats(name, workers)
+
+    def _put(self, out_queue, item):
+        started = time.monotonic()
+        out_queue.put(item)
+        self.stats.add(blocked=time.monotonic() - started)
+
+    def _emit(self, out_queue, item):
+        self.stats.add(items_out=1)
+        self._put(out_queue, item)
+
+    def _work(self, in_queue, out_queue, remaining):
+        while True:
+            started = time.monotonic()
+            item = in_queue.get()
+            self.stats.add(starved=time.monotonic() - started)
+            if item is _DONE:
+                # Let sibling workers see the end marker too
+                in_queue.put(_DONE)
+                break
+
+            self.stats.add(items_in=1)
+            self._run(lambda: self.func(item), out_queue)
+
+        with remaining['lock']:
+            remaining['count'] -= 1
+            last = remaining['count'] == 0
+        if last:
+            if self.flush:
+                self._run(self.flush, out_queue)
+            self.stats.finished_at = time.monotonic()
+            self._put(out_queue, _DONE)
+
+    def _run(self, produce, out_queue):
+        """Emit everything `produce()` yields, counting busy time and errors"""
+        started = time.monotonic()
+        try:
+            for output in produce() or ():
+                busy_until = time.monotonic()
+                self.stats.add(busy=busy_until - started)
+                self._emit(out_queue, output)
+                started = time.monotonic()
+        except Exception as e:
+            self.stats.add(errors=1)
+            logging.error(f"Pipeline stage {self.name} failed: {str(e)}")
+        self.stats.add(busy=time.monotonic() - started)
+
+    def start(self, in_queue, out_queue):
+        self.stats.started_at = time.monotonic()
+        remaining = {'count': self.workers, 'lock': threading.Lock()}
+        for i in range(self.workers):
+            threading.Thread(target=self._work, args=(in_queue, out_queue, remaining),
+                             name=f"pipeline-{self.name}-{i}", daemon=True).start()
+
+class Pipeline:
+    """Streaming pipeline: a source generator feeding a chain of stages
+
+    Every stage runs concurrently, connected by queues of at most
+    `queue_size` items. Iterating over `run()` yields the last stage's
+    output as soon as each item is ready.
+    """
+    def __init__(self, source_name, source, stages, queue_size=PIPELINE_QUEUE_SIZE):
+        self.source_name = source_name
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.source_stats = StageStats(source_name, 1)
+
+    def _feed(self, out_queue):
+        stats = self.source_stats
+        stats.started_at = time.monotonic()
+        try:
+            started = time.monotonic()
+            for item in self.source:
+                stats.add(busy=time.monotonic() - started, items_out=1)
+                put_started = time.monotonic()
+                out_queue.put(item)
+                stats.add(blocked=time.monotonic() - put_started)
+                started = time.monotonic()
+        except Exception as e:
+            stats.add(errors=1)
+            logging.error(f"Pipeline source {self.source_name} failed: {str(e)}")
+        finally:
+            stats.finished_at = time.monotonic()
+            out_queue.put(_DONE)
+
+    def run(self):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threading.Thread(target=self._feed, args=(queues[0],), name=f"pipeline-{self.source_name}", daemon=True).start()
+        for stage, in_queue, out_queue in zip(self.stages, queues, queues[1:]):
+            stage.start(in_queue, out_queue)
+
+        for item in iter(queues[-1].get, _DONE):
+            yield item
+
+    def report(self):
+        """Per-stage throughput and back-pressure figures"""
+        return [self.source_stats.report()] + [stage.stats.report() for stage in self.stages]
+
+def build_pipeline(scraper, quote_gen, social_media, posting_queue=None, platforms=(),
+                   max_articles=15, num_quotes=10, background_color=None,
+                   generate_workers=4, render_workers=RENDER_MAX_WORKERS, article_index=None):
+    """Chain scrape -> batch -> generate -> rank -> render (-> post) as a streaming pipeline
+
+    As in the app, at most LLM_MAX_ARTICLES new stories are sent for quotes,
+    `quote_gen.batch_size` headlines per request. Generation streams as
+    headlines arrive; the rank stage then waits for every candidate and
+    passes on the best `num_quotes` (chosen by the generator's ranker) one
+    at a time, so each is rendered in every RENDER_SIZES size and posted
+    while the next is still rendering. With an `article_index`, stories
+    already processed on earlier runs (or syndicated from another source)
+    are dropped before generation, and a story is recorded as processed
+    only once quotes have been generated for it.
+    """
+    background_color = background_color or BACKGROUND_COLORS[0]
+    batch_size = max(1, quote_gen.batch_size)
+    pending = []
+    candidates = []
+
+    def batch(article):
+        pending.append(article)
+        if len(pending) >= batch_size:
+            yield pending[:]
+            pending.clear()
+
+    def batch_rest():
+        if pending:
+            yield pending[:]
+
+    def generate(articles):
+        quotes = quote_gen.generate_quotes_for_batch(articles)
+        # Mark stories seen only once they have produced quotes
+        if article_index:
+            titles = {quote['article_title'] for quote in quotes}
+            article_index.record([article for article in articles if article['title'] in titles])
+        return quotes
+
+    def collect(quote):
+        candidates.append(quote)
+
+    def rank():
+        yield from quote_gen.select_quotes(candidates, num_quotes)
+
+    def render(quote):
+        # Files rather than buffers, since queued posts must survive a restart
+        rendered = social_media.render_batch([quote], background_color=background_color, in_memory=False,
+                                             max_workers=render_workers)
+        yield {'quote': quote, 'images': {result['size']: result['image'] for result in rendered}}
+
+    def post(rendered):
+        jobs = {}
+        for platform in platforms:
+            image_path = rendered['images'].get(platform) or next(iter(rendered['images'].values()))
+            jobs[platform] = posting_queue.enqueue(platform, rendered['quote'], image_path)
+        yield dict(rendered, jobs=jobs)
+
+    stages = [
+        Stage('batch', batch, flush=batch_rest),
+        Stage('generate', generate, workers=generate_workers),
+        Stage('rank', collect, flush=rank),
+        Stage('render', render)
+    ]
+    if platforms:
+        stages.append(Stage('post', post))
+
+    articles = scraper.iter_news(max_articles=max_articles)
+    if article_index:
+        articles = article_index.iter_new(articles, record=False)
+    return Pipeline('scrape', itertools.islice(articles, LLM_MAX_ARTICLES), stages)
+
+def wait_for_jobs(posting_queue, job_ids, timeout):
+    """Block until the given posting jobs finish or `timeout` seconds pass"""
+    deadline = time.monotonic() + timeout
+    pending = set(job_ids)
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            if posting_queue.get_job(job_id)['status'] in ('succeeded', 'failed'):
+                pending.discard(job_id)
+        time.sleep(0.5)
+    return pending
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape news, generate quotes, render and optionally post them, headlessly.")
+    parser.add_argument('--max-articles', type=int, default=15)
+    parser.add_argument('--num-quotes', type=int, default=10)
+    parser.add_argument('--color', default=BACKGROUND_COLORS[0], help="background color for rendered images")
+    parser.add_argument('--post', action='append', choices=['twitter', 'instagram'], default=[],
+                        help="queue every quote for posting to this platform (repeatable)")
+    parser.add_argument('--include-seen', action='store_true',
+                        help="also process stories already handled on earlier runs")
+    parser.add_argument('--post-timeout', type=float, default=600,
+                        help="seconds to wait for queued posts to finish before exiting")
+    parser.add_argument('--metrics-file', default=METRICS_PATH,
+                        help="write Prometheus-format metrics for the run to this file ('' to skip)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    # Imported here so `--help` works without every dependency installed
+    from news_scraper import NewsScraper
+    from quote_generator import QuoteGenerator
+    from quote_ranker import QuoteRanker
+    from social_media_manager import SocialMediaManager
+    from article_index import ArticleIndex
+    from quote_store import QuoteStore
+    from metrics import metrics
+
+    social_media = SocialMediaManager()
+    quote_store = QuoteStore()
+    batch_id = uuid.uuid4().hex
+    posting_queue = None
+    if args.post:
+        from posting_queue import PostingQueue
+        social_media.warm_up()
+        posting_queue = PostingQueue({
+            'twitter': social_media.post_to_twitter,
+            'instagram': social_media.post_to_instagram
+        }, on_finish=quote_store.update_post)
+        posting_queue.start()
+
+    # Rank against past posts like the app does, so novelty isn't always 1.0 headless
+    ranker = QuoteRanker(history=lambda: [q['text'] for q in quote_store.get_quotes(posted=True, limit=500)])
+    pipeline = build_pipeline(
+        NewsScraper(), QuoteGenerator(ranker=ranker), social_media, posting_queue, args.post,
+        max_articles=args.max_articles, num_quotes=args.num_quotes, background_color=args.color,
+        article_index=None if args.include_seen else ArticleIndex()
+    )
+
+    job_ids = []
+    for result in pipeline.run():
+        logging.info(f"Rendered: {result['quote']['text'][:60]}... -> {', '.join(result['images'].values())}")
+        quote_id = quote_store.save_quotes([result['quote']], batch_id)[0]['id']
+        for size, path in result['images'].items():
+            quote_store.record_render(quote_id, size, path)
+        for platform, job_id in result.get('jobs', {}).items():
+            quote_store.record_post(quote_id, platform, job_id)
+            quote_store.update_post(job_id, posting_queue.get_job(job_id)['status'])
+            job_ids.append(job_id)
+
+    for stats in pipeline.report():
+        logging.info(
+            f"[{stats['stage']}] in={stats['items_in']} out={stats['items_out']} errors={stats['errors']} "
+            f"elapsed={stats['elapsed_s']}s throughput={stats['throughput_per_s']}/s "
+            f"busy={stats['busy_s']}s blocked={stats['blocked_s']}s starved={stats['starved_s']}s"
+        )
+
+    status = 0
+    if posting_queue:
+        unfinished = wait_for_jobs(posting_queue, job_ids, args.post_timeout)
+        posting_queue.stop()
+        if unfinished:
+            logging.warning(f"{len(unfinished)} posting job(s) still pending; they will resume on the next run")
+            status = 1
+
+    if args.metrics_file:
+        logging.info(f"Metrics written to {metrics.write_textfile(args.metrics_file)}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from rate_limit import TokenBucket
+from config import (
+    POST_QUEUE_PATH, POST_WORKERS, POST_MAX_ATTEMPTS,
+    POST_BACKOFF_BASE, POST_BACKOFF_MAX, POST_RATE_LIMITS, POST_LEASE_SECONDS
+)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+class PermanentPostError(Exception):
+    """A posting failure that retrying won't fix (bad credentials, missing client)"""
+    pass
+
+def make_idempotency_key(platform, quote, image_path=None):
+    """Key identifying one post of a quote (and image) to a platform"""
+    payload = json.dumps([platform, quote['text'], image_path or ''])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PostingQueue:
+    """Durable SQLite-backed queue that posts quotes from background workers
+
+    `publishers` maps a platform name to a callable(quote, image_path) that
+    returns True on success; returning False or raising schedules a retry
+    with exponential backoff, up to `max_attempts`. A PermanentPostError or
+    ValueError fails the job immediately. Jobs are deduplicated by an
+    idempotency key, so enqueuing the same post twice returns the first job;
+    enqueuing a post whose job failed queues that job again.
+    `on_finish(job_id, status)` is called once a job succeeds or fails for good.
+
+    Several processes may share one queue file. A claimed job carries a
+    lease that its owner renews while running; only jobs whose lease has
+    expired (their worker died) are handed out again.
+    """
+    def __init__(self, publishers, path=POST_QUEUE_PATH, workers=POST_WORKERS,
+                 max_attempts=POST_MAX_ATTEMPTS, rate_limits=POST_RATE_LIMITS, on_finish=None,
+                 backoff_base=POST_BACKOFF_BASE, backoff_max=POST_BACKOFF_MAX, lease=POST_LEASE_SECONDS):
+        self.publishers = publishers
+        self.on_finish = on_finish
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.limiters = {platform: TokenBucket.per_minute(limit) for platform, limit in rate_limits.items()}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS post_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    platform TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    claimed_by TEXT,
+                    lease_expires_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_post_jobs_due ON post_jobs (status, next_attempt_at)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, platform, quote, image_path=None, idempotency_key=None):
+        """Queue a post and return its job id (the existing one for a duplicate key)
+
+        A duplicate of a failed job resets it to queued with a fresh attempt
+        budget, so a post that failed can always be tried again.
+        """
+        if platform not in self.publishers:
+            raise ValueError(f"Unknown platform: {platform}")
+
+        key = idempotency_key or make_idempotency_key(platform, quote, image_path)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO post_jobs
+                    (idempotency_key, platform, payload, status, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (idempotency_key) DO UPDATE SET
+                    status = excluded.status, attempts = 0, last_error = NULL,
+                    next_attempt_at = excluded.next_attempt_at, updated_at = excluded.updated_at
+                WHERE post_jobs.status = ?
+            ''', (key, platform, json.dumps({'quote': quote, 'image_path': image_path}), QUEUED, now, now, now, FAILED))
+            job_id = conn.execute('SELECT id FROM post_jobs WHERE idempotency_key = ?', (key,)).fetchone()['id']
+
+        self._wake.set()
+        return job_id
+
+    def get_job(self, job_id):
+        """Return a job's status as a dict, or None if it doesn't exist"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM post_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def recent_jobs(self, limit=20, offset=0):
+        """Most recently created jobs first"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM post_jobs ORDER BY id DESC LIMIT ? OFFSET ?', (limit, offset)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job.update(json.loads(job.pop('payload')))
+        return job
+
+    def start(self):
+        """Start the background workers and the thread renewing their leases"""
+        if self._threads:
+            return
+        self._stop.clear()
+        targets = [(self._work, f"post-worker-{i}") for i in range(self.workers)]
+        targets.append((self._heartbeat, "post-heartbeat"))
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Ask the workers to finish their current job and exit"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self):
+        """Atomically lease the next due job to this queue and return it
+
+        Running jobs whose lease expired were interrupted (their process
+        stopped or crashed) and are queued again first.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('''
+                    UPDATE post_jobs SET status = ?, claimed_by = NULL, lease_expires_at = NULL
+                    WHERE status = ? AND lease_expires_at < ?
+                ''', (QUEUED, RUNNING, now))
+                row = conn.execute('''
+                    SELECT * FROM post_jobs WHERE status = ? AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at, id LIMIT 1
+                ''', (QUEUED, now)).fetchone()
+                if row:
+                    conn.execute('''
+                        UPDATE post_jobs SET status = ?, attempts = attempts + 1, claimed_by = ?,
+                            lease_expires_at = ?, updated_at = ?
+                        WHERE id = ?
+                    ''', (RUNNING, self.owner, now + self.lease, now, row['id']))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        if not row:
+            return None
+        job = self._row_to_job(row)
+        job['attempts'] += 1
+        return job
+
+    def _heartbeat(self):
+        """Renew the leases of jobs this queue is running until it stops"""
+        while not self._stop.wait(self.lease / 3):
+            try:
+                with self._connect() as conn:
+                    conn.execute('UPDATE post_jobs SET lease_expires_at = ? WHERE status = ? AND claimed_by = ?',
+                                 (time.time() + self.lease, RUNNING, self.owner))
+            except sqlite3.Error as e:
+                logging.error(f"Error renewing posting job leases: {str(e)}")
+
+    def _finish(self, job, status, error=None, next_attempt_at=None):
+        with self._connect() as conn:
+            updated = conn.execute('''
+                UPDATE post_jobs SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ?,
+                    claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = ? AND claimed_by = ?
+            ''', (status, error, next_attempt_at or job['next_attempt_at'], time.time(), job['id'], self.owner)).rowcount
+        if not updated:
+            logging.warning(f"Posting job {job['id']} lost its lease while running; leaving it to its new owner")
+            return
+
+        if self.on_finish and status in (SUCCEEDED, FAILED):
+            try:
+                self.on_finish(job['id'], status)
+            except Exception as e:
+                logging.error(f"Error in posting job {job['id']} completion callback: {str(e)}")
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logging.error(f"Error claiming posting job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+
+            self._run(job)
+
+    def _run(self, job):
+        platform = job['platform']
+        limiter = self.limiters.get(platform)
+        if limiter:
+            limiter.acquire()
+
+        try:
+            if self.publishers[platform](job['quote'], job['image_path']):
+                self._finish(job, SUCCEEDED)
+                return
+            error = "publisher reported failure"
+        except (PermanentPostError, ValueError) as e:
+            logging.error(f"Posting job {job['id']} to {platform} failed permanently: {str(e)}")
+            self._finish(job, FAILED, str(e))
+            return
+        except Exception as e:
+            error = str(e)
+
+        if job['attempts'] >= self.max_attempts:
+            logging.error(f"Posting job {job['id']} to {platform} failed after {job['attempts']} attempts: {error}")
+            self._finish(job, FAILED, error)
+            return
+
+        delay = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** (job['attempts'] - 1))
+        logging.warning(f"Posting job {job['id']} to {platform} failed ({error}), retrying in {delay:.0f}s")
+        self._finish(job, QUEUED, error, time.time() + delay)
+
+class FakePlatform:
+    """Local stand-in for a social platform, for tests and dry runs
+
+    Records every post it accepts. The first `fail_times` calls fail, by
+    returning False or, when `error` is given, by raising it; `latency`
+    seconds are slept per call to mimic a media upload.
+    """
+    def __init__(self, fail_times=0, latency=0.0, error=None):
+        self.fail_times = fail_times
+        self.latency = latency
+        self.error = error
+        self.posts = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, quote, image_path=None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.fail_times:
+                if self.error:
+                    raise self.error
+                return False
+            self.posts.append({'quote': quote, 'image_path': image_path})
+            return True
@@ -1,66 +1,312 @@
+import re
+import json
 import openai
 import random
+import time
 import logging
-from config import OPENAI_API_KEY
+from concurrent.futures import ThreadPoolExecutor, wait
+from rate_limit import TokenBucket
+from llm_cache import LLMResponseCache, make_cache_key
+from quote_ranker import QuoteRanker
+from metrics import metrics
+from config import (
+    OPENAI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS,
+    LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, LLM_DEADLINE,
+    LLM_BATCH_SIZE, LLM_MAX_ARTICLES
+)
 
 openai.api_key = OPENAI_API_KEY
+# Retries are handled below with the rate limiter in the loop, not by the client
+openai.max_retries = 0
+
+SYSTEM_PROMPT = "You are a financial expert who creates powerful, quotable insights."
+
+# Generate quotes based on article title (faster than processing full content)
+PROMPT_TEMPLATE = """
+            As a financial expert, create 2 insightful and quotable statements based on this financial news headline:
+            "{title}" (from {source})
+
+            Make the quotes sound like they're from a market sage or financial thought leader.
+            Each quote should be concise (under 150 characters), impactful, and include a key insight relevant to traders or investors.
+            Don't use quotation marks in your response.
+            """
+
+# Several headlines in one request, answered as JSON keyed by headline number
+BATCH_PROMPT_TEMPLATE = """
+            As a financial expert, create 2 insightful and quotable statements for each of these {count} financial news headlines:
+            {headlines}
+
+            Make the quotes sound like they're from a market sage or financial thought leader.
+            Each quote should be concise (under 150 characters), impactful, and include a key insight relevant to traders or investors.
+            Don't use quotation marks inside the quotes.
+            Respond with JSON only, in the form:
+            {{"results": [{{"index": 1, "quotes": ["first quote", "second quote"]}}]}}
+            with one entry per headline, using the headline's number as its index.
+            """
 
 class QuoteGenerator:
-    def __init__(self):
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE, use_cache=True,
+                 batch_size=LLM_BATCH_SIZE, ranker=None):
         self.quotes_cache = []
-    
+        self.ranker = ranker or QuoteRanker()
+        self.batch_size = batch_size
+        self.response_cache = LLMResponseCache() if use_cache else None
+        self.max_concurrency = max_concurrency
+        self.request_limiter = TokenBucket.per_minute(requests_per_minute)
+        self.token_limiter = TokenBucket.per_minute(tokens_per_minute)
+
     def generate_quotes_from_articles(self, articles, num_quotes=10):
         """Generate quotes from a list of articles"""
+        all_quotes = self.generate_candidates(articles)
+
+        # Rank the candidates locally and keep the best ones
+        return self.select_quotes(all_quotes, num_quotes)
+
+    def generate_candidates(self, articles):
+        """Every candidate quote for the first LLM_MAX_ARTICLES articles, before ranking"""
         if not articles:
             raise ValueError("No articles provided to generate quotes from")
-        
+
+        with metrics.span('generate_quotes'):
+            # Limit the number of articles processed
+            return self.generate_quotes_concurrently(articles[:LLM_MAX_ARTICLES])
+
+    def select_quotes(self, candidates, num_quotes=10):
+        """Rank candidate quotes and keep the best `num_quotes`"""
+        with metrics.span('rank_quotes'):
+            selected_quotes = self.ranker.select(candidates, num_quotes)
+
+        self.quotes_cache = selected_quotes
+        return selected_quotes
+
+    def generate_quotes_concurrently(self, articles, deadline=LLM_DEADLINE, batch_size=None):
+        """Generate quotes for every article in parallel, within an overall deadline
+
+        Headlines already in the response cache are resolved first. The rest
+        are packed `batch_size` to a request (one request per article when
+        it is 1) and run on up to `max_concurrency` threads, throttled by the
+        request and token buckets. Articles that have not finished when
+        `deadline` seconds have passed are dropped. Quotes are returned in
+        article order.
+        """
+        batch_size = max(1, batch_size or self.batch_size)
+        deadline_at = time.monotonic() + deadline
+
+        results = {}
+        pending = []
+        for index, article in enumerate(articles):
+            cached_quotes = self._get_cached_quotes(article, PROMPT_TEMPLATE, BATCH_PROMPT_TEMPLATE)
+            if cached_quotes is not None:
+                results[index] = cached_quotes
+            else:
+                pending.append((index, article))
+
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='quote-gen')
+        try:
+            futures = [executor.submit(self._generate_batch, batch, deadline_at) for batch in batches]
+            done, not_done = wait(futures, timeout=max(0, deadline_at - time.monotonic()))
+
+            if not_done:
+                logging.warning(f"Quote generation deadline of {deadline}s reached, dropping {len(not_done)} request(s)")
+
+            for future in done:
+                results.update(future.result())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
         all_quotes = []
-        
-        # Process each article to generate quotes
-        for article in articles[:min(10, len(articles))]:  # Limit to 10 articles for processing
-            title = article['title']
-            source = article['source']
-            
-            # Generate quotes based on article title (faster than processing full content)
-            prompt = f"""
-            As a financial expert, create 2 insightful and quotable statements based on this financial news headline:
-            "{title}" (from {source})
-            
-            Make the quotes sound like they're from a market sage or financial thought leader.
-            Each quote should be concise (under 150 characters), impactful, and include a key insight relevant to traders or investors.
-            Don't use quotation marks in your response.
-            """
-            
+        for index in sorted(results):
+            all_quotes.extend(results[index])
+        return all_quotes
+
+    def generate_quotes_for_batch(self, articles, deadline=LLM_DEADLINE):
+        """Generate quotes for a few articles in one request, for callers that stream articles in
+
+        Callers pass up to `batch_size` articles at a time; cached headlines
+        are served without a request as in generate_quotes_concurrently.
+        """
+        return self.generate_quotes_concurrently(articles, deadline, batch_size=len(articles))
+
+    def _cache_key(self, article, template):
+        return make_cache_key(article['title'], article['source'], template, LLM_MODEL, LLM_TEMPERATURE)
+
+    def _get_cached_quotes(self, article, *templates):
+        """Return quotes cached for the article under any of the given prompt templates"""
+        if not self.response_cache:
+            return None
+        for template in templates:
+            quotes = self.response_cache.get(self._cache_key(article, template))
+            if quotes is not None:
+                metrics.inc('cache_requests_total', cache='llm', result='hit')
+                return quotes
+        metrics.inc('cache_requests_total', cache='llm', result='miss')
+        return None
+
+    def _cache_quotes(self, article, template, quotes):
+        if quotes and self.response_cache:
+            self.response_cache.put(self._cache_key(article, template), quotes)
+
+    def _generate_batch(self, batch, deadline_at):
+        """Generate quotes for a list of (index, article) pairs, returning {index: quotes}
+
+        Several articles are asked for in one structured request; any article
+        the response doesn't cover properly is retried on its own. The caller
+        has already looked every article up in the cache.
+        """
+        if len(batch) == 1:
+            index, article = batch[0]
+            return {index: self._generate_for_article(article, deadline_at)}
+
+        results = {}
+        try:
+            headlines = '\n'.join(
+                f'{number}. "{article["title"]}" (from {article["source"]})'
+                for number, (_, article) in enumerate(batch, start=1)
+            )
+            generated_text = self._complete(
+                BATCH_PROMPT_TEMPLATE.format(count=len(batch), headlines=headlines),
+                deadline_at,
+                max_tokens=LLM_MAX_TOKENS * len(batch),
+                json_output=True
+            )
+            parsed = _parse_batch_response(generated_text, len(batch))
+        except Exception as e:
+            logging.error(f"Error generating quotes for a batch of {len(batch)} articles: {str(e)}")
+            parsed = {}
+
+        for number, (index, article) in enumerate(batch, start=1):
+            quotes = [self._make_quote(text, article) for text in parsed.get(number, []) if len(text) > 20]
+            if quotes:
+                self._cache_quotes(article, BATCH_PROMPT_TEMPLATE, quotes)
+                results[index] = quotes
+            else:
+                logging.warning(f"Batch response had no usable quotes for '{article['title']}', retrying it alone")
+                results[index] = self._generate_for_article(article, deadline_at)
+        return results
+
+    def _make_quote(self, text, article):
+        return {
+            'text': text,
+            'source': f"Based on {article['source']} headline",
+            'article_title': article['title']
+        }
+
+    def _build_prompt(self, title, source):
+        return PROMPT_TEMPLATE.format(title=title, source=source)
+
+    def _generate_for_article(self, article, deadline_at):
+        """Generate quotes for one article the caller already missed in the cache, and cache them"""
+        quotes = self._request_quotes(article, deadline_at)
+        self._cache_quotes(article, PROMPT_TEMPLATE, quotes)
+        return quotes
+
+    def _request_quotes(self, article, deadline_at):
+        """Ask the model for quotes on one headline, logging and swallowing any error"""
+        title = article['title']
+        try:
+            generated_text = self._complete(self._build_prompt(title, article['source']), deadline_at)
+        except Exception as e:
+            logging.error(f"Error generating quotes for article '{title}': {str(e)}")
+            return []
+
+        # Split the text into individual quotes
+        quote_lines = [q.strip() for q in generated_text.split('\n') if q.strip()]
+
+        quotes = []
+        for quote in quote_lines:
+            if quote and len(quote) > 20:  # Skip too short quotes
+                quotes.append(self._make_quote(quote, article))
+        return quotes
+
+    def _complete(self, prompt, deadline_at, max_tokens=LLM_MAX_TOKENS, json_output=False):
+        """Run one chat completion under the rate limits, retrying transient failures"""
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        # Rough token estimate (~4 chars per token) plus the completion budget
+        estimated_tokens = (len(SYSTEM_PROMPT) + len(prompt)) // 4 + max_tokens
+        extra_options = {'response_format': {'type': 'json_object'}} if json_output else {}
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            if not (self.request_limiter.acquire(1, deadline_at)
+                    and self.token_limiter.acquire(estimated_tokens, deadline_at)):
+                raise TimeoutError("rate limit would exceed the generation deadline")
+
             try:
-                response = openai.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a financial expert who creates powerful, quotable insights."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=200,
-                    temperature=0.7
-                )
-                
-                generated_text = response.choices[0].message.content.strip()
-                
-                # Split the text into individual quotes
-                quote_lines = [q.strip() for q in generated_text.split('\n') if q.strip()]
-                
-                for quote in quote_lines:
-                    if quote and len(quote) > 20:  # Skip too short quotes
-                        all_quotes.append({
-                            'text': quote,
-                            'source': f"Based on {source} headline",
-                            'article_title': title
-                        })
-                
+                with metrics.span('llm_request', model=LLM_MODEL):
+                    response = openai.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=LLM_TEMPERATURE,
+                        timeout=max(1.0, deadline_at - time.monotonic()),
+                        **extra_options
+                    )
             except Exception as e:
-                logging.error(f"Error generating quotes for article '{title}': {str(e)}")
-        
-        # Shuffle and select the best quotes
-        random.shuffle(all_quotes)
-        selected_quotes = all_quotes[:num_quotes]
-        
-        self.quotes_cache = selected_quotes
-        return selected_quotes 
\ No newline at end of file
+                # A failed request doesn't spend completion tokens
+                self.token_limiter.consume(-estimated_tokens)
+                if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(e, attempt)
+                if time.monotonic() + delay > deadline_at:
+                    raise
+                metrics.inc('llm_retries_total')
+                logging.warning(f"Retrying completion in {delay:.1f}s after error: {str(e)}")
+                time.sleep(delay)
+                continue
+
+            # Correct the token bucket with the real usage when the API reports it
+            usage = getattr(response, 'usage', None)
+            if usage is not None and getattr(usage, 'total_tokens', None):
+                self.token_limiter.consume(usage.total_tokens - estimated_tokens)
+                metrics.inc('llm_tokens_total', usage.prompt_tokens or 0, kind='prompt')
+                metrics.inc('llm_tokens_total', usage.completion_tokens or 0, kind='completion')
+
+            return response.choices[0].message.content.strip()
+
+def _parse_batch_response(text, count):
+    """Map headline numbers (1..count) to quote strings from a batch JSON response
+
+    Raises ValueError when the response isn't the expected JSON shape;
+    individual malformed entries are skipped.
+    """
+    # Tolerate a ```json fenced block around the payload
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    data = json.loads(text)
+    entries = data.get('results') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("batch response has no results list")
+
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('index')
+        quotes = entry.get('quotes')
+        if not isinstance(index, int) or not 1 <= index <= count or not isinstance(quotes, list):
+            continue
+        parsed[index] = [q.strip().strip('"') for q in quotes if isinstance(q, str) and q.strip()]
+    return parsed
+
+def _is_retryable(error):
+    """True for rate limiting, server errors and connection problems"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (openai.APIConnectionError, TimeoutError))
+
+def _backoff_delay(error, attempt):
+    """Exponential backoff with full jitter, honoring a Retry-After header if present"""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        if retry_after:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+    except ValueError:
+        pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
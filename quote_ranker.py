@@ -0,0 +1,90 @@
+import re
+import zlib
+import numpy as np
+from config import MAX_QUOTE_LENGTH, RANKER_WEIGHTS, RANKER_DUPLICATE_THRESHOLD
+
+HASH_DIMENSIONS = 2048
+
+def hashed_ngram_vectors(texts, dimensions=HASH_DIMENSIONS):
+    """L2-normalized hashed word unigram+bigram vectors, one row per text
+
+    crc32 keeps the hashing stable across processes, so vectors of past
+    posts can be compared with today's candidates.
+    """
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            rows.append(row)
+            cols.append(zlib.crc32(gram.encode('utf-8')) % dimensions)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def length_scores(texts, max_length=MAX_QUOTE_LENGTH):
+    """1.0 near the ideal length (60% of the maximum), falling off either side, 0 past the maximum"""
+    lengths = np.array([len(text) for text in texts], dtype=np.float32)
+    target = 0.6 * max_length
+    scores = 1.0 - np.abs(lengths - target) / target
+    scores[lengths > max_length] = 0.0
+    return np.clip(scores, 0.0, 1.0)
+
+class QuoteRanker:
+    """Cheap local ranking of candidate quotes, replacing random selection
+
+    Every candidate is scored in one vectorized pass on length fit and on
+    novelty against past posts (1 - highest cosine similarity of hashed
+    n-gram vectors). Selection is then greedy: each pick is penalized for
+    similarity to quotes already chosen and for repeating a source, and
+    near-duplicates of a chosen quote are skipped outright.
+
+    `history` is an optional callable returning texts of previously posted
+    quotes.
+    """
+    def __init__(self, history=None, weights=RANKER_WEIGHTS, duplicate_threshold=RANKER_DUPLICATE_THRESHOLD):
+        self.history = history
+        self.weights = weights
+        self.duplicate_threshold = duplicate_threshold
+
+    def score(self, quotes):
+        """Base score of each quote (length fit and novelty), as a NumPy array"""
+        texts = [quote['text'] for quote in quotes]
+        vectors = hashed_ngram_vectors(texts)
+
+        novelty = np.ones(len(texts), dtype=np.float32)
+        past_texts = list(self.history()) if self.history else []
+        if past_texts:
+            similarity_to_past = vectors @ hashed_ngram_vectors(past_texts).T
+            novelty = 1.0 - similarity_to_past.max(axis=1)
+
+        scores = self.weights['length'] * length_scores(texts) + self.weights['novelty'] * novelty
+        return scores, vectors
+
+    def select(self, quotes, num_quotes):
+        """Return up to num_quotes of the best quotes, best first"""
+        if not quotes:
+            return []
+
+        scores, vectors = self.score(quotes)
+        similarity = vectors @ vectors.T
+        sources = np.array([quote['source'] for quote in quotes])
+
+        available = np.ones(len(quotes), dtype=bool)
+        redundancy = np.zeros(len(quotes), dtype=np.float32)
+        source_penalty = np.zeros(len(quotes), dtype=np.float32)
+        selected = []
+
+        while len(selected) < num_quotes and available.any():
+            adjusted = scores - self.weights['redundancy'] * redundancy - self.weights['source_repeat'] * source_penalty
+            adjusted[~available] = -np.inf
+            best = int(np.argmax(adjusted))
+            selected.append(best)
+
+            available[best] = False
+            available &= similarity[best] < self.duplicate_threshold
+            redundancy = np.maximum(redundancy, similarity[best])
+            source_penalty += sources == sources[best]
+
+        return [quotes[i] for i in selected]
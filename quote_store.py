@@ -0,0 +1,207 @@
+import os
+import time
+import uuid
+import sqlite3
+from datetime import datetime
+from contextlib import contextmanager
+from config import QUOTE_STORE_PATH
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        source TEXT NOT NULL,
+        date TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date);
+    CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, date);
+
+    CREATE TABLE IF NOT EXISTS quotes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch_id TEXT NOT NULL,
+        text TEXT NOT NULL,
+        source TEXT NOT NULL,
+        article_title TEXT,
+        date TEXT NOT NULL,
+        posted INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_quotes_date ON quotes (date, id);
+    CREATE INDEX IF NOT EXISTS idx_quotes_source ON quotes (source, id);
+    CREATE INDEX IF NOT EXISTS idx_quotes_posted ON quotes (posted, id);
+    CREATE INDEX IF NOT EXISTS idx_quotes_batch ON quotes (batch_id);
+
+    CREATE TABLE IF NOT EXISTS renders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        quote_id INTEGER NOT NULL REFERENCES quotes (id),
+        size TEXT NOT NULL,
+        path TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        UNIQUE (quote_id, size, path)
+    );
+
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        quote_id INTEGER REFERENCES quotes (id),
+        platform TEXT NOT NULL,
+        job_id INTEGER NOT NULL UNIQUE,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_posts_quote ON posts (quote_id);
+'''
+
+QUOTE_COLUMNS = 'id, batch_id, text, source, article_title, date, posted'
+
+def today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+class QuoteStore:
+    """Indexed SQLite store for articles, quotes, renders and post history
+
+    Runs in WAL mode so several app workers can read while one writes, and
+    every save is a single transaction, so readers never see a half-written
+    refresh. Listing queries are keyset-paginated (pass the last id seen as
+    `before_id`), so every page is an index seek on (filter, id) no matter
+    how deep it is.
+    """
+    def __init__(self, path=QUOTE_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_articles(self, articles):
+        """Record fetched articles, ignoring ones already stored"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO articles (url, title, source, date, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(a['url'], a['title'], a['source'], a.get('date') or today(), now) for a in articles]
+            )
+
+    def save_quotes(self, quotes, batch_id=None):
+        """Store one refresh's quotes atomically; returns copies carrying 'id' and 'batch_id'"""
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        saved = []
+        with self._connect() as conn:
+            for quote in quotes:
+                cursor = conn.execute(
+                    'INSERT INTO quotes (batch_id, text, source, article_title, date, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (batch_id, quote['text'], quote['source'], quote.get('article_title'), today(), now)
+                )
+                saved.append(dict(quote, id=cursor.lastrowid, batch_id=batch_id))
+        return saved
+
+    def latest_batch(self, date=None):
+        """Quotes from the most recent refresh on `date` (today by default), or []"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT batch_id FROM quotes WHERE date = ? ORDER BY id DESC LIMIT 1', (date or today(),)
+            ).fetchone()
+            if not row:
+                return []
+            rows = conn.execute(
+                f'SELECT {QUOTE_COLUMNS} FROM quotes WHERE batch_id = ? ORDER BY id', (row['batch_id'],)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def _quote_filters(self, date, source, posted, before_id=None):
+        clauses, params = [], []
+        if date is not None:
+            clauses.append('date = ?')
+            params.append(date)
+        if source is not None:
+            clauses.append('source = ?')
+            params.append(source)
+        if posted is not None:
+            clauses.append('posted = ?')
+            params.append(int(bool(posted)))
+        if before_id is not None:
+            clauses.append('id < ?')
+            params.append(before_id)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def get_quotes(self, date=None, source=None, posted=None, limit=20, before_id=None):
+        """Page of quotes, newest first, optionally filtered by date, source and posted status
+
+        Pass the id of the last quote on the previous page as `before_id` to
+        get the next page.
+        """
+        where, params = self._quote_filters(date, source, posted, before_id)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT {QUOTE_COLUMNS} FROM quotes{where} ORDER BY id DESC LIMIT ?', params + [limit]
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def count_quotes(self, date=None, source=None, posted=None):
+        where, params = self._quote_filters(date, source, posted)
+        with self._connect() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM quotes{where}', params).fetchone()[0]
+
+    def record_render(self, quote_id, size, path):
+        """Remember where a quote's image was rendered"""
+        if quote_id is None:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO renders (quote_id, size, path, created_at) VALUES (?, ?, ?, ?)',
+                (quote_id, size, path, time.time())
+            )
+
+    def get_renders(self, quote_id):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT size, path FROM renders WHERE quote_id = ? ORDER BY id', (quote_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def record_post(self, quote_id, platform, job_id, status='queued'):
+        """Link a posting-queue job to the quote it posts"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO posts (quote_id, platform, job_id, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO NOTHING
+            ''', (quote_id, platform, job_id, status, now, now))
+
+    def update_post(self, job_id, status):
+        """Update a post's status; a successful post marks its quote as posted"""
+        with self._connect() as conn:
+            conn.execute('UPDATE posts SET status = ?, updated_at = ? WHERE job_id = ?', (status, time.time(), job_id))
+            if status == 'succeeded':
+                conn.execute(
+                    'UPDATE quotes SET posted = 1 WHERE id = (SELECT quote_id FROM posts WHERE job_id = ?)', (job_id,)
+                )
+
+    def get_posts(self, quote_id=None, limit=20, before_id=None):
+        """Page of post history, newest first; `before_id` works as in get_quotes"""
+        query = 'SELECT id, quote_id, platform, job_id, status, created_at, updated_at FROM posts'
+        clauses, params = [], []
+        if quote_id is not None:
+            clauses.append('quote_id = ?')
+            params.append(quote_id)
+        if before_id is not None:
+            clauses.append('id < ?')
+            params.append(before_id)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY id DESC LIMIT ?'
+        with self._connect() as conn:
+            rows = conn.execute(query, params + [limit]).fetchall()
+        return [dict(r) for r in rows]
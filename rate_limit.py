@@ -0,0 +1,48 @@
+import time
+import threading
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second
+
+    `acquire` blocks until enough tokens are available (or the deadline
+    passes); `consume` charges tokens unconditionally, letting the level go
+    negative so a later correction still throttles future callers.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount):
+        """Bucket allowing `amount` tokens per minute, with a minute's worth of burst"""
+        return cls(amount / 60.0, capacity=amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1, deadline=None):
+        """Take `amount` tokens, waiting as needed; False if `deadline` (monotonic) would pass first"""
+        # Requests bigger than the bucket could never be satisfied otherwise
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return True
+                wait = (amount - self._level) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def consume(self, amount):
+        """Charge (or refund, if negative) tokens without waiting"""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
@@ -1,114 +1,338 @@
 import os
+import io
+import json
+import hashlib
 import logging
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+import threading
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
 import tweepy
 from instagrapi import Client
+from metrics import metrics
+from text_layout import load_font, fit_text, text_width
 from config import (
     TWITTER_API_KEY, TWITTER_API_SECRET, 
     TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET,
     INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD,
-    BACKGROUND_COLORS
+    BACKGROUND_COLORS, RENDER_SIZES, RENDER_QUALITY, RENDER_MAX_WORKERS,
+    INSTAGRAM_SESSION_FILE, CLIENT_INIT_TIMEOUT
 )
 
+# Quote text is sized to fill its box, between these point sizes
+QUOTE_FONT_MIN_SIZE = 28
+QUOTE_FONT_MAX_SIZE = 80
+QUOTE_LINE_SPACING = 1.15
+QUOTE_MARGIN = 0.08  # fraction of the canvas kept clear on each side
+SOURCE_FONT_SIZE = 35
+SOURCE_AREA_HEIGHT = 100  # reserved at the bottom for the source line
+
+# Bump whenever the drawing code changes so stale renders aren't reused
+RENDER_TEMPLATE_VERSION = 2
+
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+
+def render_key(quote, background_color, width, height, image_format='JPEG', quality=RENDER_QUALITY):
+    """Stable content hash identifying a rendered quote image across restarts"""
+    payload = json.dumps({
+        'text': quote['text'],
+        'source': quote['source'],
+        'color': background_color.lower(),
+        'size': [width, height],
+        'format': [image_format.upper(), quality],
+        'template': RENDER_TEMPLATE_VERSION
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def render_path(quote, background_color, width, height, image_format='JPEG', quality=RENDER_QUALITY):
+    """Path under generated_images/ where a render is cached"""
+    key = render_key(quote, background_color, width, height, image_format, quality)
+    extension = IMAGE_EXTENSIONS.get(image_format.upper(), image_format.lower())
+    return os.path.join('generated_images', f"quote_{key[:32]}.{extension}")
+
+def render_quote_image(quote, background_color, width, height):
+    """Draw a quote card and return it as a PIL image"""
+    # Create image with background color
+    img = Image.new('RGB', (width, height), background_color)
+    draw = ImageDraw.Draw(img)
+
+    small_font = load_font(SOURCE_FONT_SIZE)
+
+    # Fit the quote to the box above the source line, as large as it will go
+    margin_x, margin_y = int(width * QUOTE_MARGIN), int(height * QUOTE_MARGIN)
+    box_width = width - 2 * margin_x
+    box_height = height - margin_y - SOURCE_AREA_HEIGHT - margin_y // 2
+    layout = fit_text(quote['text'], box_width, box_height,
+                      QUOTE_FONT_MIN_SIZE, QUOTE_FONT_MAX_SIZE, QUOTE_LINE_SPACING)
+    font = load_font(layout.size)
+
+    # Draw each line centered, white with a slight shadow for better readability
+    shadow_offset = max(2, layout.size // 18)
+    y = margin_y + (box_height - layout.height) // 2
+    for line, line_width in zip(layout.lines, layout.widths):
+        x = (width - int(line_width)) // 2
+        draw.text((x + shadow_offset, y + shadow_offset), line, font=font, fill=(0, 0, 0, 128))
+        draw.text((x, y), line, font=font, fill=(255, 255, 255))
+        y += layout.line_height
+
+    # Draw small source text at the bottom
+    source_text = f"Source: {quote['source']}"
+    source_width = text_width(source_text, SOURCE_FONT_SIZE)
+    draw.text(((width - int(source_width)) // 2, height - 80), source_text,
+              font=small_font, fill=(255, 255, 255, 200))
+
+    return img
+
+def encode_image(img, image_format='JPEG', quality=RENDER_QUALITY):
+    """Encode a PIL image to bytes in the given format and quality"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format.upper(), quality=quality)
+    return buffer.getvalue()
+
+def _render_job(args):
+    """Process pool entry point: render and encode one image, returning its bytes"""
+    quote, background_color, width, height, image_format, quality = args
+    return encode_image(render_quote_image(quote, background_color, width, height), image_format, quality)
+
+def _write_atomic(path, data):
+    # Write to a temp file first so a concurrent reader never sees a partial image
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def _image_file(image):
+    """Path to an image given as a path or an in-memory buffer (written to a temp file)"""
+    if isinstance(image, (str, os.PathLike)):
+        yield image
+        return
+    extension = os.path.splitext(getattr(image, 'name', ''))[1] or '.jpg'
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as f:
+        f.write(image.getvalue())
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+class LazyClient:
+    """A client built on a background thread the first time it is needed
+
+    `state` is one of 'idle', 'connecting', 'connected', 'unconfigured'
+    (the factory returned None) or 'failed'. A failed client is retried on
+    the next `start` or `get`.
+    """
+    def __init__(self, name, factory):
+        self.name = name
+        self.error = None
+        self._factory = factory
+        self._client = None
+        self._state = 'idle'
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    @property
+    def state(self):
+        return self._state
+
+    def start(self):
+        """Begin connecting in the background; a no-op if already started"""
+        with self._lock:
+            if self._state not in ('idle', 'failed'):
+                return
+            self._state = 'connecting'
+            self._ready.clear()
+        threading.Thread(target=self._connect, name=f"{self.name}-init", daemon=True).start()
+
+    def _connect(self):
+        try:
+            self._client = self._factory()
+            self._state = 'connected' if self._client else 'unconfigured'
+        except Exception as e:
+            self.error = str(e)
+            self._state = 'failed'
+            logging.error(f"Failed to initialize {self.name} client: {str(e)}")
+        finally:
+            self._ready.set()
+
+    def get(self, timeout=CLIENT_INIT_TIMEOUT):
+        """Return the client, waiting up to `timeout` seconds for it to connect"""
+        self.start()
+        self._ready.wait(timeout)
+        return self._client
+
 class SocialMediaManager:
     def __init__(self):
-        self.setup_twitter()
-        self.setup_instagram()
+        # Clients connect lazily in the background so construction never blocks on a login
+        self._twitter = LazyClient('Twitter', self.setup_twitter)
+        self._instagram = LazyClient('Instagram', self.setup_instagram)
         
         # Create directory for images if it doesn't exist
         os.makedirs('generated_images', exist_ok=True)
+
+        # Preload the source font; quote sizes are loaded as layouts pick them
+        load_font(SOURCE_FONT_SIZE)
+
+    def _require_client(self, lazy_client, hint):
+        """Return the connected client or raise
+
+        ValueError means the platform isn't configured, which retrying won't
+        fix; ConnectionError means it is still connecting or its login failed,
+        so the posting queue retries later.
+        """
+        client = lazy_client.get()
+        if client:
+            return client
+        if lazy_client.state == 'unconfigured':
+            raise ValueError(f"{lazy_client.name} client not initialized. {hint}")
+        raise ConnectionError(f"{lazy_client.name} client not ready ({lazy_client.state}): "
+                              f"{lazy_client.error or 'still connecting'}")
+
+    @property
+    def twitter_client(self):
+        return self._twitter.get()
+
+    @property
+    def instagram_client(self):
+        return self._instagram.get()
+
+    def warm_up(self):
+        """Start connecting both clients in the background without waiting"""
+        self._twitter.start()
+        self._instagram.start()
+
+    def connection_status(self):
+        """Current state of each platform client, e.g. {'twitter': 'connected', ...}"""
+        return {'twitter': self._twitter.state, 'instagram': self._instagram.state}
     
     def setup_twitter(self):
         """Set up Twitter API client"""
-        self.twitter_client = None
-        if all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET]):
-            try:
-                auth = tweepy.OAuth1UserHandler(
-                    TWITTER_API_KEY, TWITTER_API_SECRET,
-                    TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
-                )
-                self.twitter_client = tweepy.API(auth)
-                logging.info("Twitter client initialized successfully")
-            except Exception as e:
-                logging.error(f"Failed to initialize Twitter client: {str(e)}")
+        if not all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET]):
+            return None
+
+        auth = tweepy.OAuth1UserHandler(
+            TWITTER_API_KEY, TWITTER_API_SECRET,
+            TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
+        )
+        client = tweepy.API(auth)
+        logging.info("Twitter client initialized successfully")
+        return client
     
     def setup_instagram(self):
-        """Set up Instagram API client"""
-        self.instagram_client = None
-        if INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD:
+        """Set up Instagram API client, reusing a saved session when possible"""
+        if not (INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD):
+            return None
+
+        client = Client()
+        if os.path.exists(INSTAGRAM_SESSION_FILE):
             try:
-                self.instagram_client = Client()
-                self.instagram_client.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-                logging.info("Instagram client initialized successfully")
+                client.load_settings(INSTAGRAM_SESSION_FILE)
             except Exception as e:
-                logging.error(f"Failed to initialize Instagram client: {str(e)}")
+                logging.warning(f"Ignoring unreadable Instagram session file: {str(e)}")
+                client = Client()
+
+        # With loaded settings this reuses the stored session instead of a full login
+        client.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
+        # The session holds live cookies and tokens: keep it readable by the owner only
+        os.makedirs(os.path.dirname(INSTAGRAM_SESSION_FILE) or '.', exist_ok=True)
+        os.close(os.open(INSTAGRAM_SESSION_FILE, os.O_WRONLY | os.O_CREAT, 0o600))
+        os.chmod(INSTAGRAM_SESSION_FILE, 0o600)
+        client.dump_settings(INSTAGRAM_SESSION_FILE)
+        logging.info("Instagram client initialized successfully")
+        return client
     
-    def create_quote_image(self, quote, background_color=None, width=1080, height=1080):
-        """Create an image with the quote text"""
+    def create_quote_image(self, quote, background_color=None, width=1080, height=1080,
+                           image_format='JPEG', quality=RENDER_QUALITY):
+        """Create an image with the quote text
+
+        Renders are cached on disk under a content hash of the quote, color,
+        size and template, so repeat previews and posts reuse the same file.
+        """
         if not background_color:
             background_color = BACKGROUND_COLORS[0]
-        
-        # Create image with background color
-        img = Image.new('RGB', (width, height), background_color)
-        draw = ImageDraw.Draw(img)
-        
-        # Load font (using default system font, you can specify a path to a custom font)
-        try:
-            font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'Roboto-Bold.ttf')
-            if os.path.exists(font_path):
-                font = ImageFont.truetype(font_path, 55)
-                small_font = ImageFont.truetype(font_path, 35)
-            else:
-                # Use default font if custom font not available
-                font = ImageFont.load_default()
-                font_size = 55
-                small_font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-        
-        # Wrap text to fit image width
-        quote_text = quote['text']
-        wrapped_text = textwrap.fill(quote_text, width=30)
-        
-        # Calculate text position (centered)
-        text_bbox = draw.textbbox((0, 0), wrapped_text, font=font)
-        text_width, text_height = text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1]
-        position = ((width - text_width) // 2, (height - text_height) // 2)
-        
-        # Draw white text with slight shadow for better readability
-        shadow_offset = 3
-        draw.text((position[0] + shadow_offset, position[1] + shadow_offset), wrapped_text, 
-                  font=font, fill=(0, 0, 0, 128))
-        draw.text(position, wrapped_text, font=font, fill=(255, 255, 255))
-        
-        # Draw small source text at the bottom
-        source_text = f"Source: {quote['source']}"
-        source_bbox = draw.textbbox((0, 0), source_text, font=small_font)
-        source_width = source_bbox[2] - source_bbox[0]
-        draw.text(((width - source_width) // 2, height - 80), source_text, 
-                  font=small_font, fill=(255, 255, 255, 200))
-        
-        # Save the image
-        file_path = os.path.join('generated_images', f"quote_{hash(quote_text)}.jpg")
-        img.save(file_path)
-        
+
+        file_path = render_path(quote, background_color, width, height, image_format, quality)
+        if os.path.exists(file_path):
+            metrics.inc('cache_requests_total', cache='render', result='hit')
+            return file_path
+
+        metrics.inc('cache_requests_total', cache='render', result='miss')
+        with metrics.span('render', size=f"{width}x{height}"):
+            img = render_quote_image(quote, background_color, width, height)
+            _write_atomic(file_path, encode_image(img, image_format, quality))
+
         return file_path
-    
-    def post_to_twitter(self, quote, image_path=None):
-        """Post a quote to Twitter, with or without an image"""
-        if not self.twitter_client:
-            raise ValueError("Twitter client not initialized. Check your API credentials.")
-        
-        try:
-            if image_path:
-                # Post with image
-                media = self.twitter_client.media_upload(image_path)
-                self.twitter_client.update_status(status=quote['text'], media_ids=[media.media_id])
+
+    def render_batch(self, quotes, sizes=None, background_color=None, image_format='JPEG',
+                     quality=RENDER_QUALITY, in_memory=True, max_workers=RENDER_MAX_WORKERS):
+        """Render every quote in every size, spreading the work over a process pool
+
+        `sizes` maps a name (e.g. 'instagram') to (width, height) and defaults
+        to RENDER_SIZES. Returns one dict per (quote, size) job with keys
+        'quote', 'size' and 'image', where 'image' is a BytesIO holding the
+        encoded file when in_memory=True, or a path under generated_images/
+        otherwise. Jobs already rendered to disk are not drawn again.
+        """
+        if not background_color:
+            background_color = BACKGROUND_COLORS[0]
+        sizes = sizes or RENDER_SIZES
+
+        jobs = []
+        for quote in quotes:
+            for name, (width, height) in sizes.items():
+                path = render_path(quote, background_color, width, height, image_format, quality)
+                jobs.append({'quote': quote, 'size': name, 'path': path,
+                             'args': (quote, background_color, width, height, image_format, quality)})
+
+        to_render = [job for job in jobs if not os.path.exists(job['path'])]
+        metrics.inc('cache_requests_total', len(jobs) - len(to_render), cache='render', result='hit')
+        metrics.inc('cache_requests_total', len(to_render), cache='render', result='miss')
+        # Workers run in other processes, so the batch is timed as a whole here
+        with metrics.span('render_batch'):
+            if len(to_render) > 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    rendered = list(executor.map(_render_job, [job['args'] for job in to_render]))
             else:
-                # Post text only
-                self.twitter_client.update_status(quote['text'])
+                rendered = [_render_job(job['args']) for job in to_render]
+
+        encoded = {}
+        for job, data in zip(to_render, rendered):
+            encoded[job['path']] = data
+            if not in_memory:
+                _write_atomic(job['path'], data)
+
+        results = []
+        for job in jobs:
+            if in_memory:
+                data = encoded.get(job['path'])
+                if data is None:
+                    with open(job['path'], 'rb') as f:
+                        data = f.read()
+                image = io.BytesIO(data)
+                image.name = os.path.basename(job['path'])
+            else:
+                image = job['path']
+            results.append({'quote': job['quote'], 'size': job['size'], 'image': image})
+        return results
+
+    def post_to_twitter(self, quote, image=None):
+        """Post a quote to Twitter, with or without an image (a path or a BytesIO from render_batch)"""
+        twitter_client = self._require_client(self._twitter, "Check your API credentials.")
+
+        try:
+            with metrics.span('post', platform='twitter'):
+                if image is not None:
+                    # Post with image, uploading a buffer straight from memory
+                    if isinstance(image, (str, os.PathLike)):
+                        media = twitter_client.media_upload(image)
+                    else:
+                        image.seek(0)
+                        media = twitter_client.media_upload(getattr(image, 'name', 'quote.jpg'), file=image)
+                    twitter_client.update_status(status=quote['text'], media_ids=[media.media_id])
+                else:
+                    # Post text only
+                    twitter_client.update_status(quote['text'])
             
             logging.info(f"Successfully posted to Twitter: {quote['text'][:30]}...")
             return True
@@ -116,14 +340,15 @@ class SocialMediaManager:
             logging.error(f"Failed to post to Twitter: {str(e)}")
             return False
     
-    def post_to_instagram(self, quote, image_path):
-        """Post a quote image to Instagram"""
-        if not self.instagram_client:
-            raise ValueError("Instagram client not initialized. Check your credentials.")
-        
+    def post_to_instagram(self, quote, image):
+        """Post a quote image (a path or a BytesIO from render_batch) to Instagram"""
+        instagram_client = self._require_client(self._instagram, "Check your credentials.")
+
         try:
             caption = f"{quote['text']}\n\n#finance #trading #investing #marketwisdom #stockmarket"
-            self.instagram_client.photo_upload(image_path, caption)
+            # instagrapi only uploads from disk
+            with metrics.span('post', platform='instagram'), _image_file(image) as image_path:
+                instagram_client.photo_upload(image_path, caption)
             
             logging.info(f"Successfully posted to Instagram: {quote['text'][:30]}...")
             return True
@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import (
+    SOURCE_HEALTH_PATH, SOURCE_FAILURE_THRESHOLD, SOURCE_COOLDOWN, SOURCE_COOLDOWN_MAX,
+    SOURCE_MIN_READ_TIMEOUT, SOURCE_LATENCY_SAMPLES, FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT
+)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Smoothing for latency and its deviation, as for TCP retransmission timers (RFC 6298)
+LATENCY_ALPHA = 1 / 8
+DEVIATION_BETA = 1 / 4
+
+class SourceHealth:
+    """Persistent per-source circuit breaker and latency tracker
+
+    After `failure_threshold` consecutive failures a source's circuit opens
+    and `allow` refuses it for a cool-off period, which doubles every time
+    a trial fetch after cooling off fails again (up to `cooldown_max`). The
+    first fetch allowed after the cool-off is a half-open trial: success
+    closes the circuit, failure reopens it.
+
+    Successful fetch times feed a smoothed latency and deviation, from
+    which `timeout_for` derives a read timeout of latency + 4 * deviation,
+    kept between SOURCE_MIN_READ_TIMEOUT and FETCH_READ_TIMEOUT.
+    """
+    def __init__(self, path=SOURCE_HEALTH_PATH, failure_threshold=SOURCE_FAILURE_THRESHOLD,
+                 cooldown=SOURCE_COOLDOWN, cooldown_max=SOURCE_COOLDOWN_MAX):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.cooldown_max = cooldown_max
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_health (
+                    name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    opens INTEGER NOT NULL DEFAULT 0,
+                    opened_at REAL,
+                    latency REAL,
+                    latency_dev REAL,
+                    samples INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, conn, name):
+        row = conn.execute('SELECT * FROM source_health WHERE name = ?', (name,)).fetchone()
+        if row:
+            return dict(row)
+        return {'name': name, 'state': CLOSED, 'failures': 0, 'opens': 0, 'opened_at': None,
+                'latency': None, 'latency_dev': None, 'samples': 0, 'last_error': None}
+
+    def _save(self, conn, health):
+        health['updated_at'] = time.time()
+        conn.execute('''
+            INSERT OR REPLACE INTO source_health
+                (name, state, failures, opens, opened_at, latency, latency_dev, samples, last_error, updated_at)
+            VALUES (:name, :state, :failures, :opens, :opened_at, :latency, :latency_dev, :samples, :last_error, :updated_at)
+        ''', health)
+
+    def _cooldown_for(self, health):
+        return min(self.cooldown_max, self.cooldown * 2 ** max(0, health['opens'] - 1))
+
+    def allow(self, name):
+        """True if the source may be fetched now; an expired open circuit lets one trial through"""
+        with self._lock, self._connect() as conn:
+            health = self._get(conn, name)
+            if health['state'] == CLOSED:
+                return True
+            # Open, or half-open with a trial that never reported back: wait out the cool-off
+            if time.time() - health['opened_at'] < self._cooldown_for(health):
+                return False
+            health['state'] = HALF_OPEN
+            health['opened_at'] = time.time()
+            self._save(conn, health)
+            return True
+
+    def record_success(self, name, latency):
+        """Close the circuit and fold the fetch time into the latency estimate"""
+        with self._lock, self._connect() as conn:
+            health = self._get(conn, name)
+            if health['latency'] is None:
+                health['latency'] = latency
+                health['latency_dev'] = latency / 2
+            else:
+                health['latency_dev'] += DEVIATION_BETA * (abs(latency - health['latency']) - health['latency_dev'])
+                health['latency'] += LATENCY_ALPHA * (latency - health['latency'])
+            health.update(state=CLOSED, failures=0, opens=0, opened_at=None, samples=health['samples'] + 1)
+            self._save(conn, health)
+
+    def record_failure(self, name, error):
+        """Count a failure; returns True if this opened the circuit"""
+        with self._lock, self._connect() as conn:
+            health = self._get(conn, name)
+            health['failures'] += 1
+            health['last_error'] = str(error)[:500]
+            opened = health['state'] == HALF_OPEN or (
+                health['state'] == CLOSED and health['failures'] >= self.failure_threshold)
+            if opened:
+                health.update(state=OPEN, opens=health['opens'] + 1, opened_at=time.time())
+            self._save(conn, health)
+            return opened
+
+    def timeout_for(self, name):
+        """(connect, read) timeout for the source, adapted to its observed latency"""
+        with self._connect() as conn:
+            health = self._get(conn, name)
+        if health['samples'] < SOURCE_LATENCY_SAMPLES:
+            return (FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT)
+        read_timeout = health['latency'] + 4 * health['latency_dev']
+        return (FETCH_CONNECT_TIMEOUT, min(FETCH_READ_TIMEOUT, max(SOURCE_MIN_READ_TIMEOUT, read_timeout)))
+
+    def status(self):
+        """Health of every source seen so far, with seconds left before an open circuit retries"""
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute('SELECT * FROM source_health ORDER BY name').fetchall()]
+        now = time.time()
+        for health in rows:
+            health['retry_in'] = (max(0.0, health['opened_at'] + self._cooldown_for(health) - now)
+                                  if health['state'] != CLOSED else 0.0)
+        return rows
+
+    def reset(self, name=None):
+        """Forget the health of one source, or of every source"""
+        with self._lock, self._connect() as conn:
+            if name is None:
+                conn.execute('DELETE FROM source_health')
+            else:
+                conn.execute('DELETE FROM source_health WHERE name = ?', (name,))
@@ -0,0 +1,57 @@
+import pytest
+from article_index import ArticleIndex
+
+def article(title, url, source='CNBC'):
+    return {'title': title, 'url': url, 'source': source}
+
+@pytest.fixture
+def index(tmp_path):
+    return ArticleIndex(path=str(tmp_path / 'index.sqlite3'))
+
+def test_seen_articles_are_filtered(index):
+    story = article("Fed raises rates by 25 basis points in surprise move", "https://www.cnbc.com/fed-hike")
+    assert index.filter_new([story]) == [story]
+    assert index.filter_new([story]) == []
+
+def test_tracking_parameters_do_not_make_a_new_story(index):
+    index.record([article("Oil prices jump as OPEC extends supply cuts", "https://cnbc.com/oil?utm_source=x")])
+    assert index.filter_new([article("Oil prices jump as OPEC extends supply cuts", "https://www.cnbc.com/oil/")]) == []
+
+def test_checking_without_recording_leaves_articles_new(index):
+    stories = [
+        article("Treasury yields climb after strong jobs report", "https://cnbc.com/yields"),
+        article("Bitcoin slides as regulators tighten crypto rules", "https://cnbc.com/bitcoin"),
+        article("Walmart lifts annual outlook on grocery demand", "https://cnbc.com/walmart"),
+    ]
+    assert index.filter_new(stories, record=False) == stories
+    index.record(stories[:1])
+    assert index.filter_new(stories, record=False) == stories[1:]
+
+def test_duplicates_within_one_call_are_dropped_without_recording(index):
+    first = article("Nvidia shares surge after record quarterly revenue", "https://cnbc.com/nvda")
+    same_url = article("Nvidia shares surge after record quarterly revenue", "https://www.cnbc.com/nvda?utm_medium=rss")
+    assert index.filter_new([first, same_url], record=False) == [first]
+    assert list(index.iter_new(iter([first, same_url]), record=False)) == [first]
+
+@pytest.mark.parametrize('seen, other', [
+    ("Fed raises rates by 25 basis points", "ECB raises rates by 25 basis points"),
+    ("Apple stock rises after earnings beat", "Google stock rises after earnings beat"),
+])
+def test_headlines_differing_by_one_entity_are_different_stories(index, seen, other):
+    index.record([article(seen, "https://cnbc.com/first")])
+    assert index.filter_new([article(other, "https://bloomberg.com/second")]) != []
+
+def test_syndicated_headline_is_a_duplicate(index):
+    index.record([article("Oil prices jump as OPEC extends supply cuts into next year", "https://cnbc.com/oil")])
+    syndicated = article("Oil prices jump as OPEC extends supply cuts into next year - Reuters",
+                         "https://finance.yahoo.com/news/oil", source='Yahoo Finance')
+    assert index.filter_new([syndicated]) == []
+
+def test_short_headlines_only_match_by_url(index):
+    index.record([article("Stocks rally", "https://cnbc.com/rally")])
+    assert index.filter_new([article("Stocks rally", "https://marketwatch.com/rally")]) != []
+    assert index.filter_new([article("Stocks rally", "https://www.cnbc.com/rally/")]) == []
+
+def test_changed_headline_on_same_url_is_new(index):
+    index.record([article("Markets open higher ahead of inflation data", "https://cnbc.com/live")])
+    assert index.filter_new([article("Markets slump after hot inflation print shocks traders", "https://cnbc.com/live")]) != []
@@ -0,0 +1,152 @@
+import time
+import pytest
+from posting_queue import PostingQueue, FakePlatform, PermanentPostError, QUEUED, SUCCEEDED, FAILED
+
+QUOTE = {'text': 'Markets reward patience more reliably than prediction.', 'source': 'Based on CNBC headline'}
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(platform, **options):
+        options.setdefault('backoff_base', 0.01)
+        options.setdefault('rate_limits', {})
+        queue = PostingQueue({'twitter': platform}, path=str(tmp_path / 'queue.sqlite3'), workers=1, **options)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+def finished(queue, job_id):
+    return lambda: queue.get_job(job_id)['status'] in (SUCCEEDED, FAILED)
+
+def test_duplicate_enqueue_posts_once(make_queue):
+    platform = FakePlatform()
+    queue = make_queue(platform)
+    first = queue.enqueue('twitter', QUOTE, 'image.jpg')
+    assert queue.enqueue('twitter', QUOTE, 'image.jpg') == first
+
+    queue.start()
+    assert wait_for(finished(queue, first))
+    assert queue.enqueue('twitter', QUOTE, 'image.jpg') == first
+    time.sleep(0.2)
+    assert platform.calls == 1
+    assert queue.get_job(first)['status'] == SUCCEEDED
+
+def test_different_image_is_a_different_post(make_queue):
+    queue = make_queue(FakePlatform())
+    assert queue.enqueue('twitter', QUOTE, 'a.jpg') != queue.enqueue('twitter', QUOTE, 'b.jpg')
+
+def test_retries_until_success(make_queue):
+    platform = FakePlatform(fail_times=2)
+    queue = make_queue(platform)
+    job_id = queue.enqueue('twitter', QUOTE)
+    queue.start()
+
+    assert wait_for(finished(queue, job_id))
+    job = queue.get_job(job_id)
+    assert job['status'] == SUCCEEDED
+    assert job['attempts'] == 3
+    assert platform.calls == 3
+
+def test_failure_schedules_retry_with_backoff(make_queue):
+    queue = make_queue(FakePlatform(fail_times=1), backoff_base=60)
+    job_id = queue.enqueue('twitter', QUOTE)
+    queue.start()
+
+    assert wait_for(lambda: queue.get_job(job_id)['attempts'] == 1 and queue.get_job(job_id)['status'] == QUEUED)
+    job = queue.get_job(job_id)
+    # Jittered between half and all of the base delay on the first retry
+    assert 30 <= job['next_attempt_at'] - job['updated_at'] <= 60
+    assert job['last_error'] == 'publisher reported failure'
+
+def test_gives_up_after_max_attempts(make_queue):
+    finished_jobs = []
+    platform = FakePlatform(fail_times=10, error=ConnectionError("timed out"))
+    queue = make_queue(platform, max_attempts=2, on_finish=lambda job_id, status: finished_jobs.append(status))
+    job_id = queue.enqueue('twitter', QUOTE)
+    queue.start()
+
+    assert wait_for(finished(queue, job_id))
+    assert queue.get_job(job_id)['status'] == FAILED
+    assert platform.calls == 2
+    assert finished_jobs == [FAILED]
+
+@pytest.mark.parametrize('error', [PermanentPostError("bad credentials"), ValueError("client not configured")])
+def test_permanent_errors_are_not_retried(make_queue, error):
+    platform = FakePlatform(fail_times=10, error=error)
+    queue = make_queue(platform)
+    job_id = queue.enqueue('twitter', QUOTE)
+    queue.start()
+
+    assert wait_for(finished(queue, job_id))
+    assert queue.get_job(job_id)['status'] == FAILED
+    assert platform.calls == 1
+
+def test_failed_job_can_be_queued_again(make_queue):
+    platform = FakePlatform(fail_times=1, error=PermanentPostError("not connected yet"))
+    queue = make_queue(platform)
+    job_id = queue.enqueue('twitter', QUOTE, 'image.jpg')
+    queue.start()
+    assert wait_for(finished(queue, job_id))
+    assert queue.get_job(job_id)['status'] == FAILED
+
+    assert queue.enqueue('twitter', QUOTE, 'image.jpg') == job_id
+    assert wait_for(lambda: queue.get_job(job_id)['status'] == SUCCEEDED)
+    job = queue.get_job(job_id)
+    assert job['attempts'] == 1
+    assert job['last_error'] is None
+    assert platform.calls == 2
+
+def test_job_running_elsewhere_is_not_taken_over(make_queue):
+    other = make_queue(FakePlatform())
+    job_id = other.enqueue('twitter', QUOTE)
+    assert other._claim()['id'] == job_id
+
+    platform = FakePlatform()
+    queue = make_queue(platform)
+    queue.start()
+    time.sleep(0.3)
+    assert platform.calls == 0
+    assert queue.get_job(job_id)['claimed_by'] == other.owner
+
+def test_job_with_expired_lease_is_run_again(make_queue):
+    crashed = make_queue(FakePlatform(), lease=0.1)
+    job_id = crashed.enqueue('twitter', QUOTE)
+    assert crashed._claim()['id'] == job_id
+
+    platform = FakePlatform()
+    queue = make_queue(platform)
+    queue.start()
+    assert wait_for(lambda: queue.get_job(job_id)['status'] == SUCCEEDED)
+    assert platform.calls == 1
+    assert queue.get_job(job_id)['attempts'] == 2
+
+def test_running_job_keeps_its_lease(make_queue):
+    platform = FakePlatform(latency=0.5)
+    queue = make_queue(platform, lease=0.15)
+    job_id = queue.enqueue('twitter', QUOTE)
+    queue.start()
+    assert wait_for(lambda: queue.get_job(job_id)['status'] != QUEUED)
+
+    other = make_queue(FakePlatform())
+    time.sleep(0.3)
+    assert other._claim() is None
+    assert wait_for(finished(queue, job_id))
+    assert queue.get_job(job_id)['status'] == SUCCEEDED
+    assert platform.calls == 1
+
+def test_unknown_platform_is_rejected(make_queue):
+    queue = make_queue(FakePlatform())
+    with pytest.raises(ValueError):
+        queue.enqueue('myspace', QUOTE)
@@ -0,0 +1,54 @@
+import json
+import time
+import pytest
+from quote_generator import QuoteGenerator, _parse_batch_response
+
+QUOTE = "Markets reward patience more reliably than prediction."
+
+def response(*entries):
+    return json.dumps({'results': [{'index': index, 'quotes': quotes} for index, quotes in entries]})
+
+def test_parses_every_entry():
+    text = response((1, [QUOTE]), (2, ['"Risk is what remains after you think of everything."']))
+    assert _parse_batch_response(text, 2) == {
+        1: [QUOTE],
+        2: ["Risk is what remains after you think of everything."]
+    }
+
+def test_accepts_a_fenced_block_or_a_bare_list():
+    assert _parse_batch_response(f"```json\n{response((1, [QUOTE]))}\n```", 1) == {1: [QUOTE]}
+    assert _parse_batch_response(json.dumps([{'index': 1, 'quotes': [QUOTE]}]), 1) == {1: [QUOTE]}
+
+def test_skips_malformed_entries():
+    text = json.dumps({'results': [
+        'not an entry',
+        {'index': '1', 'quotes': [QUOTE]},
+        {'index': 3, 'quotes': [QUOTE]},
+        {'index': 0, 'quotes': [QUOTE]},
+        {'index': 1, 'quotes': QUOTE},
+        {'index': 2, 'quotes': [QUOTE, 42, '   ']},
+    ]})
+    assert _parse_batch_response(text, 2) == {2: [QUOTE]}
+
+@pytest.mark.parametrize('text', ['{"results": [', 'Here are your quotes!', '{"results": {"index": 1}}', '42'])
+def test_rejects_responses_that_are_not_a_results_list(text):
+    with pytest.raises(ValueError):
+        _parse_batch_response(text, 2)
+
+def test_headlines_missing_from_a_batch_response_are_retried_alone(monkeypatch):
+    generator = QuoteGenerator(use_cache=False, batch_size=3)
+    prompts = []
+
+    def complete(prompt, deadline_at, max_tokens=None, json_output=False):
+        prompts.append(json_output)
+        if json_output:
+            return response((1, [QUOTE]), (3, ['too short']))
+        return "Discipline compounds faster than any interest rate ever could."
+
+    monkeypatch.setattr(generator, '_complete', complete)
+    articles = [{'title': f"Headline {i}", 'source': 'CNBC'} for i in range(3)]
+    results = generator._generate_batch(list(enumerate(articles)), time.monotonic() + 10)
+
+    assert prompts == [True, False, False]
+    assert [q['text'] for q in results[0]] == [QUOTE]
+    assert [q['article_title'] for q in results[1] + results[2]] == ["Headline 1", "Headline 2"]
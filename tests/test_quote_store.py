@@ -0,0 +1,33 @@
+import pytest
+from quote_store import QuoteStore
+
+@pytest.fixture
+def store(tmp_path):
+    return QuoteStore(path=str(tmp_path / 'quotes.sqlite3'))
+
+def quotes(count, source='CNBC'):
+    return [{'text': f"Quote {i}", 'source': source} for i in range(count)]
+
+def test_keyset_pages_cover_every_quote_once(store):
+    saved = store.save_quotes(quotes(12))
+    seen, before_id = [], None
+    while True:
+        page = store.get_quotes(limit=5, before_id=before_id)
+        seen.extend(q['id'] for q in page)
+        if len(page) < 5:
+            break
+        before_id = page[-1]['id']
+    assert seen == sorted((q['id'] for q in saved), reverse=True)
+
+def test_keyset_pages_apply_filters(store):
+    store.save_quotes(quotes(3, source='CNBC'))
+    reuters = store.save_quotes(quotes(3, source='Reuters'))
+    page = store.get_quotes(source='Reuters', limit=2, before_id=reuters[-1]['id'])
+    assert [q['id'] for q in page] == [reuters[1]['id'], reuters[0]['id']]
+
+def test_new_quotes_do_not_shift_later_pages(store):
+    saved = store.save_quotes(quotes(6))
+    first = store.get_quotes(limit=3)
+    store.save_quotes(quotes(2))
+    second = store.get_quotes(limit=3, before_id=first[-1]['id'])
+    assert [q['id'] for q in second] == [q['id'] for q in saved[2::-1]]
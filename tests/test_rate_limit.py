@@ -0,0 +1,68 @@
+import pytest
+import rate_limit
+from rate_limit import TokenBucket
+
+class Clock:
+    """Stands in for the time module; sleeping advances the clock instantly"""
+    def __init__(self):
+        self.now = 100.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+def test_burst_up_to_capacity_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        assert bucket.acquire()
+    assert clock.slept == 0
+    assert bucket.acquire()
+    assert clock.slept == pytest.approx(0.5)
+
+def test_gives_up_without_waiting_when_the_deadline_would_pass(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(deadline=clock.now + 0.5)
+    assert clock.slept == 0
+    # Nothing was taken by the failed attempt
+    assert bucket.acquire(deadline=clock.now + 1)
+    assert clock.slept == pytest.approx(1)
+
+def test_requests_larger_than_capacity_take_the_whole_bucket(clock):
+    bucket = TokenBucket(rate=10, capacity=100)
+    assert bucket.acquire(500)
+    assert clock.slept == 0
+    assert bucket.acquire(10)
+    assert clock.slept == pytest.approx(1)
+
+def test_refund_restores_tokens_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=10)
+    assert bucket.acquire(8)
+    bucket.consume(-5)
+    assert bucket.acquire(7)
+    assert clock.slept == 0
+    bucket.consume(-100)
+    assert bucket.acquire(10, deadline=clock.now)
+    assert not bucket.acquire(1, deadline=clock.now)
+
+def test_overspending_throttles_later_callers(clock):
+    bucket = TokenBucket(rate=1, capacity=10)
+    bucket.consume(15)
+    assert not bucket.acquire(1, deadline=clock.now + 5)
+    assert bucket.acquire(1)
+    assert clock.slept == pytest.approx(6)
+
+def test_per_minute_allows_a_minute_of_burst(clock):
+    bucket = TokenBucket.per_minute(60)
+    assert bucket.capacity == 60
+    assert bucket.rate == pytest.approx(1)
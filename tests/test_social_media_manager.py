@@ -0,0 +1,22 @@
+import pytest
+from social_media_manager import SocialMediaManager, LazyClient
+
+QUOTE = {'text': 'Markets reward patience more reliably than prediction.', 'source': 'Based on CNBC headline'}
+
+def failing_login():
+    raise RuntimeError("login challenge")
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return SocialMediaManager()
+
+def test_unconfigured_client_fails_permanently(manager):
+    manager._twitter = LazyClient('Twitter', lambda: None)
+    with pytest.raises(ValueError):
+        manager.post_to_twitter(QUOTE)
+
+def test_client_that_failed_to_connect_is_retryable(manager):
+    manager._instagram = LazyClient('Instagram', failing_login)
+    with pytest.raises(ConnectionError, match="login challenge"):
+        manager.post_to_instagram(QUOTE, 'image.jpg')
@@ -0,0 +1,93 @@
+import pytest
+import source_health
+from source_health import SourceHealth, CLOSED, OPEN, HALF_OPEN
+from config import FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT, SOURCE_MIN_READ_TIMEOUT, SOURCE_LATENCY_SAMPLES
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(source_health, 'time', clock)
+    return clock
+
+@pytest.fixture
+def health(tmp_path, clock):
+    return SourceHealth(path=str(tmp_path / 'health.sqlite3'), failure_threshold=3, cooldown=60, cooldown_max=200)
+
+def state(health, name='CNBC'):
+    return {row['name']: row for row in health.status()}[name]['state']
+
+def test_circuit_opens_after_consecutive_failures(health):
+    assert not health.record_failure('CNBC', 'timeout')
+    assert not health.record_failure('CNBC', 'timeout')
+    assert health.record_failure('CNBC', 'timeout')
+    assert state(health) == OPEN
+    assert not health.allow('CNBC')
+
+def test_success_resets_the_failure_count(health):
+    health.record_failure('CNBC', 'timeout')
+    health.record_failure('CNBC', 'timeout')
+    health.record_success('CNBC', 0.5)
+    assert not health.record_failure('CNBC', 'timeout')
+    assert health.allow('CNBC')
+
+def test_trial_after_cooldown_closes_on_success(health, clock):
+    for _ in range(3):
+        health.record_failure('CNBC', 'timeout')
+    clock.now += 61
+    assert health.allow('CNBC')
+    assert state(health) == HALF_OPEN
+    # Only the trial goes through until it reports back
+    assert not health.allow('CNBC')
+
+    health.record_success('CNBC', 0.5)
+    assert state(health) == CLOSED
+    assert health.allow('CNBC')
+
+def test_failed_trial_reopens_with_a_longer_cooldown(health, clock):
+    for _ in range(3):
+        health.record_failure('CNBC', 'timeout')
+    clock.now += 61
+    assert health.allow('CNBC')
+    assert health.record_failure('CNBC', 'still down')
+    assert state(health) == OPEN
+
+    clock.now += 61
+    assert not health.allow('CNBC')
+    clock.now += 60
+    assert health.allow('CNBC')
+
+def test_cooldown_is_capped(health, clock):
+    for _ in range(3):
+        health.record_failure('CNBC', 'timeout')
+    for _ in range(4):
+        clock.now += 200
+        assert health.allow('CNBC')
+        health.record_failure('CNBC', 'still down')
+    assert health.status()[0]['retry_in'] == 200
+
+def test_timeout_is_fixed_until_enough_samples(health):
+    for _ in range(SOURCE_LATENCY_SAMPLES - 1):
+        health.record_success('CNBC', 0.1)
+    assert health.timeout_for('CNBC') == (FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT)
+
+@pytest.mark.parametrize('latency, expected', [
+    (0.1, SOURCE_MIN_READ_TIMEOUT),
+    (30, FETCH_READ_TIMEOUT),
+])
+def test_timeout_is_clamped(health, latency, expected):
+    for _ in range(SOURCE_LATENCY_SAMPLES):
+        health.record_success('CNBC', latency)
+    assert health.timeout_for('CNBC') == (FETCH_CONNECT_TIMEOUT, expected)
+
+def test_timeout_follows_latency_between_the_bounds(health):
+    for _ in range(SOURCE_LATENCY_SAMPLES):
+        health.record_success('CNBC', 2.0)
+    _, read_timeout = health.timeout_for('CNBC')
+    assert SOURCE_MIN_READ_TIMEOUT < read_timeout < FETCH_READ_TIMEOUT
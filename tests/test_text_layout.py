@@ -0,0 +1,40 @@
+import pytest
+from text_layout import fit_text, wrap_text, line_height, text_width, ELLIPSIS
+
+QUOTE = "Markets reward patience more reliably than prediction, and discipline more reliably than brilliance."
+
+def fits(layout, max_width, max_height):
+    return layout.height <= max_height and all(width <= max_width for width in layout.widths)
+
+def test_short_text_gets_the_largest_size():
+    layout = fit_text("Buy low", 800, 800, 10, 60)
+    assert layout.size == 60
+    assert layout.lines == ["Buy low"]
+
+def test_picks_the_largest_size_that_fits():
+    layout = fit_text(QUOTE, 400, 200, 10, 120)
+    assert fits(layout, 400, 200)
+    assert ' '.join(layout.lines) == QUOTE
+    bigger = layout.size + 1
+    assert len(wrap_text(QUOTE, bigger, 400)) * line_height(bigger) > 200
+
+def test_layout_size_matches_its_lines():
+    layout = fit_text(QUOTE, 400, 200, 10, 120)
+    assert layout.widths == [text_width(line, layout.size) for line in layout.lines]
+    assert layout.width == max(layout.widths)
+    assert layout.height == layout.line_height * len(layout.lines)
+
+def test_overflowing_text_is_truncated_with_an_ellipsis():
+    layout = fit_text(QUOTE * 20, 300, 100, 20, 40)
+    assert layout.size == 20
+    assert layout.lines[-1].endswith(ELLIPSIS)
+    assert len(layout.lines) == 100 // line_height(20)
+    assert fits(layout, 300, 100)
+
+@pytest.mark.parametrize('max_width', [50, 120])
+def test_words_wider_than_the_line_are_split(max_width):
+    word = "Supercalifragilisticexpialidocious"
+    lines = wrap_text(word, 20, max_width)
+    assert len(lines) > 1
+    assert ''.join(lines) == word
+    assert all(text_width(line, 20) <= max_width for line in lines)
@@ -0,0 +1,146 @@
+import os
+import logging
+from functools import lru_cache
+from PIL import ImageFont
+
+FONT_PATH = os.path.join(os.path.dirname(__file__), 'fonts', 'Roboto-Bold.ttf')
+
+ELLIPSIS = '…'
+
+# Per font size: character -> advance width in pixels
+_advance_widths = {}
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """Load the quote font at a given size once per process"""
+    try:
+        if os.path.exists(FONT_PATH):
+            return ImageFont.truetype(FONT_PATH, size)
+    except Exception as e:
+        logging.error(f"Failed to load font {FONT_PATH}: {str(e)}")
+    # Use default font if custom font not available (scalable on Pillow >= 10.1)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=None)
+def line_height(size, spacing=1.0):
+    """Distance between baselines of consecutive lines at a font size"""
+    font = load_font(size)
+    if hasattr(font, 'getmetrics'):
+        ascent, descent = font.getmetrics()
+    else:
+        ascent, descent = size, 0
+    return round((ascent + descent) * spacing)
+
+def char_width(char, size):
+    """Advance width of one character, measured once per font size"""
+    widths = _advance_widths.setdefault(size, {})
+    width = widths.get(char)
+    if width is None:
+        width = widths[char] = load_font(size).getlength(char)
+    return width
+
+def text_width(text, size):
+    """Width of a single line as the sum of cached advances (kerning is ignored)"""
+    return sum(char_width(char, size) for char in text)
+
+def clear_layout_caches():
+    """Drop loaded fonts and measured glyphs, e.g. after swapping FONT_PATH"""
+    load_font.cache_clear()
+    line_height.cache_clear()
+    fit_text.cache_clear()
+    _advance_widths.clear()
+
+def _split_word(word, size, max_width):
+    """Break a word wider than the line into pieces that fit"""
+    pieces, current, current_width = [], '', 0.0
+    for char in word:
+        width = char_width(char, size)
+        if current and current_width + width > max_width:
+            pieces.append(current)
+            current, current_width = '', 0.0
+        current += char
+        current_width += width
+    if current:
+        pieces.append(current)
+    return pieces
+
+def wrap_text(text, size, max_width):
+    """Greedy word wrap to a pixel width at a font size; returns the lines"""
+    space = char_width(' ', size)
+    lines, current, current_width = [], [], 0.0
+    for word in text.split():
+        word_width = text_width(word, size)
+        if word_width > max_width:
+            pieces = _split_word(word, size, max_width)
+            word, word_width = pieces[-1], text_width(pieces[-1], size)
+            if current:
+                lines.append(' '.join(current))
+            lines.extend(pieces[:-1])
+            current, current_width = [], 0.0
+
+        needed = word_width + (space if current else 0.0)
+        if current and current_width + needed > max_width:
+            lines.append(' '.join(current))
+            current, current_width = [word], word_width
+        else:
+            current.append(word)
+            current_width += needed
+    if current:
+        lines.append(' '.join(current))
+    return lines
+
+def _truncate(lines, size, max_width, max_lines):
+    """Keep the first max_lines lines, ending the last one with an ellipsis"""
+    lines = lines[:max_lines]
+    last = lines[-1]
+    while last and text_width(last + ELLIPSIS, size) > max_width:
+        last = last[:-1]
+    lines[-1] = last.rstrip() + ELLIPSIS
+    return lines
+
+class TextLayout:
+    """Lines of text wrapped at one font size, with the size of the block they fill"""
+    def __init__(self, lines, size, line_height, widths):
+        self.lines = lines
+        self.size = size
+        self.line_height = line_height
+        self.widths = widths
+        self.width = max(widths, default=0)
+        self.height = line_height * len(lines)
+
+@lru_cache(maxsize=1024)
+def fit_text(text, max_width, max_height, min_size, max_size, spacing=1.0):
+    """Largest font size (by binary search) at which the wrapped text fits the box
+
+    Each candidate size costs one greedy wrap over cached advance widths, so
+    no text is rasterized or bounding-boxed while searching. If the text
+    doesn't fit even at `min_size`, the lines that fit are kept and the last
+    one ends with an ellipsis.
+    """
+    def layout(size):
+        return wrap_text(text, size, max_width)
+
+    def fits(lines, size):
+        return len(lines) * line_height(size, spacing) <= max_height
+
+    best_size, best_lines = None, None
+    low, high = min_size, max_size
+    while low <= high:
+        size = (low + high) // 2
+        lines = layout(size)
+        if fits(lines, size):
+            best_size, best_lines = size, lines
+            low = size + 1
+        else:
+            high = size - 1
+
+    if best_size is None:
+        best_size = min_size
+        max_lines = max(1, max_height // line_height(best_size, spacing))
+        best_lines = _truncate(layout(best_size), best_size, max_width, max_lines)
+
+    widths = [text_width(line, best_size) for line in best_lines]
+    return TextLayout(best_lines, best_size, line_height(best_size, spacing), widths)